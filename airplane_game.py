@@ -1,511 +1,1354 @@
-import pygame
-import random
-import sys
-import os
-import json
-import math
-
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
-
-# Constants
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-FPS = 60
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0)
-GREEN = (0, 255, 0)
-PURPLE = (128, 0, 128)
-ORANGE = (255, 165, 0)
-
-# High score file
-HIGH_SCORE_FILE = "high_score.json"
-
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(2, 5)
-        self.speed_x = random.uniform(-2, 2)
-        self.speed_y = random.uniform(-2, 2)
-        self.life = 255
-
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.life -= 5
-        self.size = max(0, self.size - 0.1)
-
-    def draw(self, screen):
-        if self.life > 0:
-            alpha = min(255, self.life)
-            color = (*self.color[:3], alpha)
-            pygame.draw.circle(screen, color, (int(self.x), int(self.y)), int(self.size))
-
-class Airplane(pygame.sprite.Sprite):
-    def __init__(self, type="default"):
-        super().__init__()
-        self.type = type
-        self.image = pygame.Surface((50, 30), pygame.SRCALPHA)
-        
-        if type == "default":
-            pygame.draw.polygon(self.image, BLUE, [(0, 15), (40, 0), (50, 15), (40, 30)])
-            self.speed = 5
-            self.health = 100
-        elif type == "fast":
-            pygame.draw.polygon(self.image, GREEN, [(0, 15), (40, 0), (50, 15), (40, 30)])
-            self.speed = 7
-            self.health = 80
-        elif type == "tank":
-            pygame.draw.polygon(self.image, RED, [(0, 15), (40, 0), (50, 15), (40, 30)])
-            self.speed = 3
-            self.health = 150
-        
-        self.rect = self.image.get_rect()
-        self.rect.centerx = SCREEN_WIDTH // 4
-        self.rect.centery = SCREEN_HEIGHT // 2
-        self.score = 0
-        self.invincible = False
-        self.invincible_timer = 0
-        self.particles = []
-        self.bullets = []
-        self.shoot_timer = 0
-
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP] and self.rect.top > 0:
-            self.rect.y -= self.speed
-        if keys[pygame.K_DOWN] and self.rect.bottom < SCREEN_HEIGHT:
-            self.rect.y += self.speed
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < SCREEN_WIDTH:
-            self.rect.x += self.speed
-
-        # Update invincibility
-        if self.invincible:
-            self.invincible_timer -= 1
-            if self.invincible_timer <= 0:
-                self.invincible = False
-
-        # Update particles
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
-
-        # Update bullets
-        self.bullets = [b for b in self.bullets if b.life > 0]
-        for bullet in self.bullets:
-            bullet.update()
-
-        # Shooting
-        self.shoot_timer += 1
-        if keys[pygame.K_SPACE] and self.shoot_timer >= 15:  # Shoot every 15 frames
-            self.shoot()
-            self.shoot_timer = 0
-
-    def shoot(self):
-        bullet = Bullet(self.rect.right, self.rect.centery)
-        self.bullets.append(bullet)
-
-    def draw_particles(self, screen):
-        for particle in self.particles:
-            particle.draw(screen)
-
-    def draw_bullets(self, screen):
-        for bullet in self.bullets:
-            bullet.draw(screen)
-
-    def add_particles(self, color):
-        for _ in range(10):
-            self.particles.append(Particle(self.rect.centerx, self.rect.centery, color))
-
-class Bullet:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.speed = 10
-        self.life = 100  # Bullet lifetime in frames
-
-    def update(self):
-        self.x += self.speed
-        self.life -= 1
-
-    def draw(self, screen):
-        if self.life > 0:
-            pygame.draw.circle(screen, YELLOW, (int(self.x), int(self.y)), 3)
-
-class Boss(pygame.sprite.Sprite):
-    def __init__(self, level):
-        super().__init__()
-        self.image = pygame.Surface((100, 100), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, ORANGE, (50, 50), 50)
-        self.rect = self.image.get_rect()
-        self.rect.x = SCREEN_WIDTH
-        self.rect.y = SCREEN_HEIGHT // 2 - 50
-        self.health = 200 + level * 50
-        self.speed = 2
-        self.move_direction = 1
-        self.shoot_timer = 0
-        self.bullets = []
-
-    def update(self):
-        # Move up and down
-        self.rect.y += self.speed * self.move_direction
-        if self.rect.top <= 0 or self.rect.bottom >= SCREEN_HEIGHT:
-            self.move_direction *= -1
-
-        # Move left slowly
-        self.rect.x -= 1
-
-        # Shooting
-        self.shoot_timer += 1
-        if self.shoot_timer >= 60:  # Shoot every second
-            self.shoot()
-            self.shoot_timer = 0
-
-        # Update bullets
-        self.bullets = [b for b in self.bullets if b.life > 0]
-        for bullet in self.bullets:
-            bullet.update()
-
-    def shoot(self):
-        # Shoot in multiple directions
-        for angle in range(0, 360, 45):
-            bullet = BossBullet(self.rect.centerx, self.rect.centery, angle)
-            self.bullets.append(bullet)
-
-    def draw_bullets(self, screen):
-        for bullet in self.bullets:
-            bullet.draw(screen)
-
-class BossBullet:
-    def __init__(self, x, y, angle):
-        self.x = x
-        self.y = y
-        self.angle = math.radians(angle)
-        self.speed = 5
-        self.life = 100
-
-    def update(self):
-        self.x += math.cos(self.angle) * self.speed
-        self.y += math.sin(self.angle) * self.speed
-        self.life -= 1
-
-    def draw(self, screen):
-        if self.life > 0:
-            pygame.draw.circle(screen, RED, (int(self.x), int(self.y)), 5)
-
-class Obstacle(pygame.sprite.Sprite):
-    def __init__(self, level):
-        super().__init__()
-        self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, (200, 200, 200), (20, 20), 20)
-        self.rect = self.image.get_rect()
-        self.rect.x = SCREEN_WIDTH
-        self.rect.y = random.randint(0, SCREEN_HEIGHT - 40)
-        self.speed = random.randint(3, 7) + level
-        self.health = 20 + level * 5
-
-class PowerUp(pygame.sprite.Sprite):
-    def __init__(self, type="health"):
-        super().__init__()
-        self.type = type
-        if type == "health":
-            color = GREEN
-        elif type == "invincible":
-            color = YELLOW
-        elif type == "speed":
-            color = PURPLE
-        
-        self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, color, (10, 10), 10)
-        self.rect = self.image.get_rect()
-        self.rect.x = SCREEN_WIDTH
-        self.rect.y = random.randint(0, SCREEN_HEIGHT - 20)
-        self.speed = 4
-
-    def update(self):
-        self.rect.x -= self.speed
-        if self.rect.right < 0:
-            self.kill()
-
-class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Airplane Game")
-        self.clock = pygame.time.Clock()
-        self.running = True
-        self.game_over = False
-        self.all_sprites = pygame.sprite.Group()
-        self.obstacles = pygame.sprite.Group()
-        self.powerups = pygame.sprite.Group()
-        self.airplane = Airplane("default")
-        self.all_sprites.add(self.airplane)
-        self.obstacle_timer = 0
-        self.powerup_timer = 0
-        self.font = pygame.font.Font(None, 36)
-        self.high_score = self.load_high_score()
-        self.level = 1
-        self.level_up_score = 1000
-        self.boss = None
-        self.boss_active = False
-        self.boss_spawn_score = 5000
-        
-        # Initialize sounds with error handling
-        self.sounds_enabled = True
-        try:
-            # Create assets directory if it doesn't exist
-            if not os.path.exists("assets"):
-                os.makedirs("assets")
-                print("Please run generate_sounds.py to create sound effects")
-                self.sounds_enabled = False
-            else:
-                self.crash_sound = pygame.mixer.Sound(os.path.join("assets", "crash.wav"))
-                self.powerup_sound = pygame.mixer.Sound(os.path.join("assets", "powerup.wav"))
-                self.background_music = pygame.mixer.Sound(os.path.join("assets", "background.wav"))
-                self.background_music.play(-1)
-        except (FileNotFoundError, pygame.error) as e:
-            print(f"Sound error: {e}")
-            print("Game will run without sound effects")
-            self.sounds_enabled = False
-
-    def load_high_score(self):
-        try:
-            with open(HIGH_SCORE_FILE, 'r') as f:
-                return json.load(f).get('high_score', 0)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return 0
-
-    def save_high_score(self):
-        with open(HIGH_SCORE_FILE, 'w') as f:
-            json.dump({'high_score': self.high_score}, f)
-
-    def handle_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r and self.game_over:
-                    self.reset_game()
-                elif event.key == pygame.K_1 and not self.game_over:
-                    self.change_airplane("default")
-                elif event.key == pygame.K_2 and not self.game_over:
-                    self.change_airplane("fast")
-                elif event.key == pygame.K_3 and not self.game_over:
-                    self.change_airplane("tank")
-
-    def change_airplane(self, type):
-        old_score = self.airplane.score
-        old_health = self.airplane.health
-        self.airplane.kill()
-        self.airplane = Airplane(type)
-        self.airplane.score = old_score
-        self.airplane.health = old_health
-        self.all_sprites.add(self.airplane)
-
-    def spawn_obstacles(self):
-        if not self.boss_active:
-            self.obstacle_timer += 1
-            if self.obstacle_timer >= max(30, 60 - self.level * 5):
-                obstacle = Obstacle(self.level)
-                self.all_sprites.add(obstacle)
-                self.obstacles.add(obstacle)
-                self.obstacle_timer = 0
-
-    def spawn_powerups(self):
-        self.powerup_timer += 1
-        if self.powerup_timer >= 300:
-            powerup_type = random.choice(["health", "invincible", "speed"])
-            powerup = PowerUp(powerup_type)
-            self.all_sprites.add(powerup)
-            self.powerups.add(powerup)
-            self.powerup_timer = 0
-
-    def check_boss_spawn(self):
-        if not self.boss_active and self.airplane.score >= self.boss_spawn_score:
-            self.boss = Boss(self.level)
-            self.all_sprites.add(self.boss)
-            self.boss_active = True
-            self.boss_spawn_score += 5000
-
-    def play_sound(self, sound):
-        if self.sounds_enabled:
-            try:
-                sound.play()
-            except:
-                pass
-
-    def check_collisions(self):
-        if not self.airplane.invincible:
-            # Check obstacle collisions
-            if pygame.sprite.spritecollide(self.airplane, self.obstacles, True):
-                self.airplane.health -= 20
-                self.play_sound(self.crash_sound)
-                self.airplane.add_particles(RED)
-                if self.airplane.health <= 0:
-                    self.game_over = True
-                    if self.airplane.score > self.high_score:
-                        self.high_score = self.airplane.score
-                        self.save_high_score()
-
-            # Check boss collisions
-            if self.boss_active and pygame.sprite.collide_rect(self.airplane, self.boss):
-                self.airplane.health -= 40
-                self.play_sound(self.crash_sound)
-                self.airplane.add_particles(RED)
-                if self.airplane.health <= 0:
-                    self.game_over = True
-                    if self.airplane.score > self.high_score:
-                        self.high_score = self.airplane.score
-                        self.save_high_score()
-
-            # Check boss bullet collisions
-            if self.boss_active:
-                for bullet in self.boss.bullets:
-                    if (self.airplane.rect.collidepoint(bullet.x, bullet.y) and 
-                        bullet.life > 0):
-                        self.airplane.health -= 10
-                        self.play_sound(self.crash_sound)
-                        self.airplane.add_particles(RED)
-                        bullet.life = 0
-                        if self.airplane.health <= 0:
-                            self.game_over = True
-                            if self.airplane.score > self.high_score:
-                                self.high_score = self.airplane.score
-                                self.save_high_score()
-
-        # Check powerup collisions
-        powerup_collisions = pygame.sprite.spritecollide(self.airplane, self.powerups, True)
-        for powerup in powerup_collisions:
-            if powerup.type == "health":
-                self.airplane.health = min(100, self.airplane.health + 20)
-                self.airplane.add_particles(GREEN)
-            elif powerup.type == "invincible":
-                self.airplane.invincible = True
-                self.airplane.invincible_timer = 180
-                self.airplane.add_particles(YELLOW)
-            elif powerup.type == "speed":
-                self.airplane.speed = 8
-                pygame.time.set_timer(pygame.USEREVENT, 5000)
-                self.airplane.add_particles(PURPLE)
-            self.play_sound(self.powerup_sound)
-
-        # Check bullet collisions with boss
-        if self.boss_active:
-            for bullet in self.airplane.bullets:
-                if (self.boss.rect.collidepoint(bullet.x, bullet.y) and 
-                    bullet.life > 0):
-                    self.boss.health -= 10
-                    bullet.life = 0
-                    if self.boss.health <= 0:
-                        self.boss.kill()
-                        self.boss_active = False
-                        self.airplane.score += 1000
-                        self.airplane.add_particles(WHITE)
-
-    def check_level_up(self):
-        if self.airplane.score >= self.level_up_score:
-            self.level += 1
-            self.level_up_score += 1000
-            self.airplane.add_particles(WHITE)
-
-    def reset_game(self):
-        self.game_over = False
-        self.airplane.health = 100
-        self.airplane.score = 0
-        self.airplane.rect.centerx = SCREEN_WIDTH // 4
-        self.airplane.rect.centery = SCREEN_HEIGHT // 2
-        self.airplane.speed = 5
-        self.level = 1
-        self.level_up_score = 1000
-        self.boss_active = False
-        self.boss_spawn_score = 5000
-        if self.boss:
-            self.boss.kill()
-        for obstacle in self.obstacles:
-            obstacle.kill()
-        for powerup in self.powerups:
-            powerup.kill()
-
-    def update(self):
-        if not self.game_over:
-            self.all_sprites.update()
-            self.spawn_obstacles()
-            self.spawn_powerups()
-            self.check_boss_spawn()
-            self.check_collisions()
-            self.check_level_up()
-            self.airplane.score += 1
-
-    def draw(self):
-        self.screen.fill(BLACK)
-        
-        # Draw background with parallax effect
-        for y in range(SCREEN_HEIGHT):
-            color = (0, 0, max(0, min(255, y // 2)))
-            pygame.draw.line(self.screen, color, (0, y), (SCREEN_WIDTH, y))
-        
-        # Draw stars
-        for _ in range(50):
-            x = random.randint(0, SCREEN_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            brightness = random.randint(100, 255)
-            pygame.draw.circle(self.screen, (brightness, brightness, brightness), (x, y), 1)
-        
-        self.all_sprites.draw(self.screen)
-        self.airplane.draw_particles(self.screen)
-        self.airplane.draw_bullets(self.screen)
-        if self.boss_active:
-            self.boss.draw_bullets(self.screen)
-        
-        # Draw UI
-        score_text = self.font.render(f"Score: {self.airplane.score}", True, WHITE)
-        health_text = self.font.render(f"Health: {self.airplane.health}", True, WHITE)
-        high_score_text = self.font.render(f"High Score: {self.high_score}", True, WHITE)
-        level_text = self.font.render(f"Level: {self.level}", True, WHITE)
-        airplane_type_text = self.font.render(f"Airplane: {self.airplane.type}", True, WHITE)
-        
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(health_text, (10, 50))
-        self.screen.blit(high_score_text, (10, 90))
-        self.screen.blit(level_text, (10, 130))
-        self.screen.blit(airplane_type_text, (10, 170))
-
-        if self.boss_active:
-            boss_health_text = self.font.render(f"Boss Health: {self.boss.health}", True, ORANGE)
-            self.screen.blit(boss_health_text, (SCREEN_WIDTH - 200, 10))
-
-        if self.airplane.invincible:
-            invincible_text = self.font.render("INVINCIBLE!", True, YELLOW)
-            self.screen.blit(invincible_text, (SCREEN_WIDTH - 150, 50))
-
-        if self.game_over:
-            game_over_text = self.font.render("GAME OVER - Press R to Restart", True, WHITE)
-            self.screen.blit(game_over_text, (SCREEN_WIDTH//2 - 200, SCREEN_HEIGHT//2))
-
-        # Draw controls help
-        controls_text = self.font.render("Controls: 1-Default 2-Fast 3-Tank SPACE-Shoot", True, WHITE)
-        self.screen.blit(controls_text, (SCREEN_WIDTH//2 - 200, SCREEN_HEIGHT - 30))
-
-        pygame.display.flip()
-
-    def run(self):
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
-
-if __name__ == "__main__":
-    game = Game()
-    game.run()
-    pygame.quit()
-    sys.exit() 
\ No newline at end of file
+# The sprite classes below subclass pygame.sprite.Sprite, so importing the
+# game always costs a pygame import; the game's own modules are cheap
+import pygame
+import random
+import sys
+import time
+import argparse
+import datetime
+import struct
+
+from background import STAR_LAYERS, Background
+from renderer import DirtyRectRenderer
+from hud import Hud
+from particles import ParticleSystem
+from projectiles import ProjectilePool
+from collision import SpatialHash, bullet_touches, sprites_touch
+from replay import Recorder, Recording, ReplayController
+from profiler import FrameProfiler, NullProfiler
+from images import ImageRegistry
+from lifecycle import Lifecycle
+from scheduler import Scheduler
+from quality import QUALITY_TIERS, QualityGovernor, star_layers, tier_index
+from loader import AssetLoader, load_audio
+from scores import ScoreStore
+from snapshot import History
+import snapshot
+from netplay import DEFAULT_PORT, NetClient, NetHost, parse_address
+
+# Constants
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+FPS = 60
+
+# Fixed simulation timestep, rendering runs separately at up to RENDER_FPS
+TICK_SECONDS = 1.0 / FPS
+MAX_CATCH_UP_TICKS = 5
+RENDER_FPS = 120
+
+# Sprites that move further than this in one tick were respawned, not moved,
+# so draw snaps them instead of interpolating across the screen
+TELEPORT_DISTANCE = 64
+
+# Colors
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+GREEN = (0, 255, 0)
+PURPLE = (128, 0, 128)
+ORANGE = (255, 165, 0)
+GREY = (200, 200, 200)
+
+# Sprite images, each rendered once and shared by every sprite that shows it
+AIRPLANE_POINTS = [(0, 15), (40, 0), (50, 15), (40, 30)]
+AIRPLANE_COLORS = {"default": BLUE, "fast": GREEN, "tank": RED}
+# The second player's airplanes in a two player game
+PARTNER_COLORS = {"default": (0, 200, 255), "fast": (180, 255, 80), "tank": (255, 120, 160)}
+POWERUP_COLORS = {"health": GREEN, "invincible": YELLOW, "speed": PURPLE}
+
+def register_sprite_images(images):
+    for type, color in AIRPLANE_COLORS.items():
+        images.register(f"airplane_{type}", (50, 30),
+                        lambda surface, color=color: pygame.draw.polygon(surface, color, AIRPLANE_POINTS))
+    for type, color in PARTNER_COLORS.items():
+        images.register(f"airplane_{type}_2", (50, 30),
+                        lambda surface, color=color: pygame.draw.polygon(surface, color, AIRPLANE_POINTS))
+    for type, color in POWERUP_COLORS.items():
+        images.register(f"powerup_{type}", (20, 20),
+                        lambda surface, color=color: pygame.draw.circle(surface, color, (10, 10), 10))
+    images.register("boss", (100, 100), lambda surface: pygame.draw.circle(surface, ORANGE, (50, 50), 50))
+    images.register("obstacle", (40, 40), lambda surface: pygame.draw.circle(surface, GREY, (20, 20), 20))
+
+IMAGES = ImageRegistry()
+register_sprite_images(IMAGES)
+
+# Pack all sprite images into one atlas surface when the display is created
+SPRITE_ATLAS = False
+
+# Projectile and particle pool sizes
+PLAYER_BULLET_CAPACITY = 256
+BOSS_BULLET_CAPACITY = 8192
+PARTICLE_CAPACITY = 8192
+
+# Broad phase grid cell size in pixels
+COLLISION_CELL_SIZE = 128
+
+# Sound effects and streamed background music, loaded after the first frame
+ASSETS_DIR = "assets"
+SOUND_EFFECTS = ("crash", "powerup")
+MUSIC = "background"
+
+# Timed effects and spawns, in simulation ticks
+INVINCIBLE_TICKS = 180
+SPEED_BOOST_TICKS = 5 * FPS
+POWERUP_INTERVAL = 300
+BOSS_FIRE_INTERVAL = 60
+
+# Extra events per level, scheduled when the level starts:
+# {level: [(ticks after the level starts, "obstacle" | "powerup" | "boss", *args)]}
+# e.g. {3: [(0, "powerup", "invincible"), (600, "boss")]}
+LEVEL_SCRIPTS = {}
+
+# Snapshots: the game counters, the counters of each airplane, then one
+# record per sprite in update order, (kind, x, y, speed, health, power-up
+# type or player, boss direction)
+GAME_STATE = struct.Struct("<IQIqq??IIiiiB")
+AIRPLANE_STATE = struct.Struct("<BBiiq?i")
+SPRITE_STATE = struct.Struct("<Biiiii")
+SPRITE_AIRPLANE, SPRITE_OBSTACLE, SPRITE_POWERUP, SPRITE_BOSS = range(4)
+AIRPLANE_TYPES = tuple(AIRPLANE_COLORS)
+POWERUP_TYPES = tuple(POWERUP_COLORS)
+SNAPSHOT_SECTIONS = ("game", "random", "scheduler", "sprites", "player_bullets", "boss_bullets", "particles")
+QUICKSAVE_FILE = "quicksave.snap"
+
+# Input bitmask
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_SHOOT = 16
+INPUT_DEFAULT = 32
+INPUT_FAST = 64
+INPUT_TANK = 128
+
+def init_pygame():
+    # Pygame is initialised on demand: only windowed games need the display and
+    # fonts, the mixer opens on the asset loader thread, headless games need none
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+class Balance:
+    # Tunable gameplay numbers. Games use DEFAULT_BALANCE unless given their
+    # own, which is how balance sweeps try out alternatives.
+    def __init__(self, **overrides):
+        # Airplane type: (speed, health)
+        self.airplane_stats = {
+            "default": (5, 100),
+            "fast": (7, 80),
+            "tank": (3, 150),
+        }
+        self.obstacle_speed_min = 3
+        self.obstacle_speed_max = 7
+        self.obstacle_speed_per_level = 1
+        self.obstacle_health = 20
+        self.obstacle_health_per_level = 5
+        self.obstacle_interval = 60
+        self.obstacle_interval_per_level = 5
+        self.obstacle_interval_min = 30
+        self.boss_health = 200
+        self.boss_health_per_level = 50
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise TypeError(f"Unknown balance setting: {name}")
+            setattr(self, name, value)
+
+DEFAULT_BALANCE = Balance()
+
+class KeyboardController:
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        controls = 0
+        if keys[pygame.K_UP]:
+            controls |= INPUT_UP
+        if keys[pygame.K_DOWN]:
+            controls |= INPUT_DOWN
+        if keys[pygame.K_LEFT]:
+            controls |= INPUT_LEFT
+        if keys[pygame.K_RIGHT]:
+            controls |= INPUT_RIGHT
+        if keys[pygame.K_SPACE]:
+            controls |= INPUT_SHOOT
+        return controls
+
+class IdleController:
+    def poll(self):
+        return 0
+
+class RandomController:
+    # Holds a random input for a random number of frames, like a button masher
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.controls = 0
+        self.hold = 0
+
+    def poll(self):
+        if self.hold <= 0:
+            self.controls = self.rng.randrange(32)
+            self.hold = self.rng.randint(5, 30)
+        self.hold -= 1
+        return self.controls
+
+class Airplane(pygame.sprite.Sprite):
+    def __init__(self, type="default", particles=None, bullets=None, balance=DEFAULT_BALANCE, player=0):
+        super().__init__()
+        self.type = type
+        self.player = player
+        self.controls = 0
+        self.particles = particles if particles is not None else ParticleSystem()
+        if bullets is None:
+            bullets = ProjectilePool(PLAYER_BULLET_CAPACITY, 3, YELLOW, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.bullets = bullets
+        name = f"airplane_{type}" if player == 0 else f"airplane_{type}_{player + 1}"
+        self.image = IMAGES.get(name)
+        self.mask = IMAGES.mask(name)
+        self.speed, self.health = balance.airplane_stats[type]
+        
+        self.rect = self.image.get_rect()
+        self.rect.centerx = SCREEN_WIDTH // 4
+        self.rect.centery = SCREEN_HEIGHT // 2
+        self.score = 0
+        self.invincible = False
+        self.shoot_timer = 0
+
+    def update(self):
+        self.move()
+
+        # Shooting
+        self.shoot_timer += 1
+        if self.controls & INPUT_SHOOT and self.shoot_timer >= 15:  # Shoot every 15 frames
+            self.shoot()
+            self.shoot_timer = 0
+
+    def move(self):
+        controls = self.controls
+        if controls & INPUT_UP and self.rect.top > 0:
+            self.rect.y -= self.speed
+        if controls & INPUT_DOWN and self.rect.bottom < SCREEN_HEIGHT:
+            self.rect.y += self.speed
+        if controls & INPUT_LEFT and self.rect.left > 0:
+            self.rect.x -= self.speed
+        if controls & INPUT_RIGHT and self.rect.right < SCREEN_WIDTH:
+            self.rect.x += self.speed
+
+    def shoot(self):
+        self.bullets.spawn_one(self.rect.right, self.rect.centery, 10, 0)
+
+    def add_particles(self, color):
+        self.particles.emit(self.rect.centerx, self.rect.centery, color)
+
+class Boss(pygame.sprite.Sprite):
+    def __init__(self, level, bullets=None, balance=DEFAULT_BALANCE):
+        super().__init__()
+        self.image = IMAGES.get("boss")
+        self.mask = IMAGES.mask("boss")
+        self.rect = self.image.get_rect()
+        self.rect.x = SCREEN_WIDTH
+        self.rect.y = SCREEN_HEIGHT // 2 - 50
+        self.health = balance.boss_health + level * balance.boss_health_per_level
+        self.speed = 2
+        self.move_direction = 1
+        if bullets is None:
+            bullets = ProjectilePool(BOSS_BULLET_CAPACITY, 5, RED, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.bullets = bullets
+
+    def update(self):
+        # Move up and down
+        self.rect.y += self.speed * self.move_direction
+        if self.rect.top <= 0 or self.rect.bottom >= SCREEN_HEIGHT:
+            self.move_direction *= -1
+
+        # Move left slowly
+        self.rect.x -= 1
+
+        # Update bullets
+        self.bullets.update()
+
+    def shoot(self):
+        # Shoot in multiple directions
+        self.bullets.spawn_ring(self.rect.centerx, self.rect.centery, 8, 5)
+
+class Obstacle(pygame.sprite.Sprite):
+    def __init__(self, level, rng=random, balance=DEFAULT_BALANCE):
+        super().__init__()
+        self.image = IMAGES.get("obstacle")
+        self.mask = IMAGES.mask("obstacle")
+        self.reset(level, rng, balance)
+
+    def reset(self, level, rng=random, balance=DEFAULT_BALANCE):
+        self.rect = self.image.get_rect()
+        self.rect.x = SCREEN_WIDTH
+        self.rect.y = rng.randint(0, SCREEN_HEIGHT - 40)
+        self.speed = (rng.randint(balance.obstacle_speed_min, balance.obstacle_speed_max)
+                      + level * balance.obstacle_speed_per_level)
+        self.health = balance.obstacle_health + level * balance.obstacle_health_per_level
+
+    def update(self):
+        self.rect.x -= self.speed
+
+class PowerUp(pygame.sprite.Sprite):
+    def __init__(self, type="health", rng=random):
+        super().__init__()
+        self.reset(type, rng)
+
+    def reset(self, type="health", rng=random):
+        self.type = type
+        self.image = IMAGES.get(f"powerup_{type}")
+        self.mask = IMAGES.mask(f"powerup_{type}")
+        self.rect = self.image.get_rect()
+        self.rect.x = SCREEN_WIDTH
+        self.rect.y = rng.randint(0, SCREEN_HEIGHT - 20)
+        self.speed = 4
+
+    def update(self):
+        self.rect.x -= self.speed
+
+class Game:
+    def __init__(self, headless=False, controller=None, dirty_rects=False, render_fps=RENDER_FPS,
+                 seed=None, recorder=None, balance=DEFAULT_BALANCE, profile_csv=None, level_scripts=None,
+                 quality="auto", target_fps=FPS, players=1):
+        # Headless games never open a window or touch the mixer
+        self.created = time.perf_counter()
+        self.headless = headless
+        if headless:
+            self.screen = None
+        else:
+            init_pygame()
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Airplane Game")
+            IMAGES.preload()
+            IMAGES.convert()
+            if SPRITE_ATLAS and IMAGES.atlas is None:
+                IMAGES.pack_atlas()
+        self.controller = controller or KeyboardController()
+        # Drives the second airplane in two player games, see netplay.py
+        self.partner_controller = IdleController()
+        self.pending_controls = 0
+        self.recorder = recorder
+        self.balance = balance
+
+        # Outcome counters for balance tuning
+        self.bosses_spawned = 0
+        self.bosses_killed = 0
+        self.damage_taken = {"obstacle": 0, "boss": 0, "boss_bullet": 0}
+        self.tick = 0
+
+        # All simulation randomness comes from this one seeded generator
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.particles = ParticleSystem(PARTICLE_CAPACITY, seed=self.rng.randrange(2 ** 32))
+        self.player_bullets = ProjectilePool(PLAYER_BULLET_CAPACITY, 3, YELLOW, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.boss_bullets = ProjectilePool(BOSS_BULLET_CAPACITY, 5, RED, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.collision_world = SpatialHash(COLLISION_CELL_SIZE)
+        self.lifecycle = Lifecycle(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.clock = pygame.time.Clock()
+        self.render_fps = render_fps
+        self.previous_positions = {}
+
+        # Frame profiling is off unless F3 shows the overlay or samples go to CSV
+        self.profiler = NullProfiler()
+        self.profile_csv = profile_csv
+        if profile_csv:
+            self.profiler = FrameProfiler(csv_path=profile_csv)
+        self.running = True
+        self.game_over = False
+        self.all_sprites = pygame.sprite.Group()
+        self.obstacles = pygame.sprite.Group()
+        self.powerups = pygame.sprite.Group()
+        self.players = [Airplane("default", self.particles, self.player_bullets, self.balance, player)
+                        for player in range(players)]
+        self.place_players()
+        self.all_sprites.add(self.players)
+        self.font = None if headless else pygame.font.Font(None, 36)
+        self.hud = None if headless else Hud(self.font)
+        self.background = None if headless else Background(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.renderer = None
+        if dirty_rects and not headless:
+            self.renderer = DirtyRectRenderer(self.screen, self.background)
+
+        # Drawing quality: "auto" lets the governor pick a tier to hold
+        # target_fps, a tier name pins that tier
+        self.quality_tier = None
+        self.governor = None
+        self.canvas = None
+        self.render_scale = 1.0
+        self.scaled_images = {}
+        if not headless:
+            if quality == "auto":
+                self.governor = QualityGovernor(target_fps)
+                self.apply_quality(self.governor.tier)
+            else:
+                self.apply_quality(tier_index(quality))
+        self.level = 1
+        self.level_up_score = 1000
+        self.boss = None
+        self.boss_active = False
+        self.boss_spawn_score = 5000
+
+        # Spawns, boss fire and effect expiry all run off one tick scheduler
+        self.scheduler = Scheduler()
+        self.level_scripts = LEVEL_SCRIPTS if level_scripts is None else level_scripts
+        self.obstacle_event = None
+        self.boss_fire_event = None
+        self.invincible_events = [None] * players
+        self.speed_events = [None] * players
+        self.start_schedule()
+
+        # Windowed games keep recent snapshots to rewind through
+        self.history = None if headless else History()
+        self.rewinding = False
+
+        # Network play endpoint, set by netplay.py
+        self.net = None
+
+        # Sounds play once the loader has them, until then the game is silent
+        self.sounds = {}
+        self.sounds_enabled = not headless
+        self.first_frame_seconds = None
+        self.loader = None
+        self.scores = ScoreStore()
+        if headless:
+            # Headless runs read the high score but never record runs
+            self.high_score = self.scores.load().high_score
+            return
+
+        # The leaderboard and sounds load in the background while frames draw
+        self.high_score = 0
+        self.loader = AssetLoader()
+        self.loader.add("leaderboard", self.scores.load)
+        self.loader.add("sounds", lambda: load_audio(ASSETS_DIR, SOUND_EFFECTS, MUSIC))
+        self.loader.start()
+
+    @property
+    def airplane(self):
+        return self.players[0]
+
+    def start_position(self, player):
+        # One airplane starts mid-height, two split the left side between them
+        return SCREEN_WIDTH // 4, SCREEN_HEIGHT * (2 * player + 1) // (2 * len(self.players))
+
+    def place_players(self):
+        for player, airplane in enumerate(self.players):
+            airplane.rect.center = self.start_position(player)
+
+    def team_score(self):
+        # Levels and bosses follow the best score among the players
+        return max(airplane.score for airplane in self.players)
+
+    def knock_out(self, airplane):
+        # A downed airplane leaves the field while any other one still flies,
+        # the run ends with the last one
+        if any(other.health > 0 for other in self.players if other is not airplane):
+            airplane.kill()
+        else:
+            self.end_run()
+
+    def end_run(self):
+        # Several hits can finish the player in one tick, the run ends once
+        if self.game_over:
+            return
+        self.game_over = True
+        self.high_score = max(self.high_score, self.airplane.score)
+        if self.headless:
+            return
+        # Queued for the score writer thread, nothing touches the disk this frame
+        self.scores.record({
+            "score": self.airplane.score,
+            "airplane": self.airplane.type,
+            "level": self.level,
+            "date": datetime.date.today().isoformat(),
+            "frames": self.tick,
+            "seed": self.seed,
+        })
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r and self.game_over and (self.net is None or self.net.authoritative):
+                    self.reset_game()
+                elif event.key == pygame.K_1 and not self.game_over:
+                    self.pending_controls |= INPUT_DEFAULT
+                elif event.key == pygame.K_2 and not self.game_over:
+                    self.pending_controls |= INPUT_FAST
+                elif event.key == pygame.K_3 and not self.game_over:
+                    self.pending_controls |= INPUT_TANK
+                elif event.key == pygame.K_F3:
+                    self.toggle_profiler()
+                elif event.key == pygame.K_F5 and self.net is None:
+                    self.quick_save()
+                elif event.key == pygame.K_F9 and self.net is None:
+                    self.quick_load()
+                elif event.key == pygame.K_BACKSPACE and self.history is not None and not self.game_over:
+                    # A finished run is already on the leaderboard, it stays finished
+                    self.rewinding = True
+            if event.type == pygame.KEYUP and event.key == pygame.K_BACKSPACE:
+                self.rewinding = False
+
+    def toggle_profiler(self):
+        if not self.profiler.enabled:
+            self.profiler = FrameProfiler()
+            self.profiler.visible = True
+        elif self.profile_csv:
+            # Keep streaming to the CSV file, only hide or show the overlay
+            self.profiler.visible = not self.profiler.visible
+        else:
+            self.profiler = NullProfiler()
+        if self.renderer:
+            self.renderer.invalidate()
+
+    def entity_counts(self):
+        return {
+            "sprites": len(self.all_sprites),
+            "obstacles": len(self.obstacles),
+            "powerups": len(self.powerups),
+            "player_bullets": len(self.player_bullets),
+            "boss_bullets": len(self.boss_bullets),
+            "particles": len(self.particles),
+            "pooled": sum(pooled for _, pooled in self.lifecycle.counts().values()),
+            "quality": self.quality_tier,
+        }
+
+    def apply_quality(self, index):
+        tier = QUALITY_TIERS[index]
+        self.quality_tier = index
+        self.particles.set_limit(tier["particles"])
+        self.particles.set_alpha(tier["particle_alpha"])
+        # Dirty rects update the window in place, so they always render at full size
+        scale = 1.0 if self.renderer else tier["render_scale"]
+        if scale != self.render_scale:
+            self.render_scale = scale
+            self.scaled_images.clear()
+            self.canvas = None
+            if scale != 1.0:
+                size = (round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale))
+                self.canvas = pygame.Surface(size).convert()
+        # A scaled canvas gets a star field at its own size, scrolling proportionally slower
+        layers = tuple((count, speed * scale, low, high)
+                       for count, speed, low, high in star_layers(tier, STAR_LAYERS))
+        size = self.canvas.get_size() if self.canvas else (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.background.set_layers(layers, size)
+        if self.renderer:
+            self.renderer.invalidate()
+
+    def govern_quality(self, seconds):
+        tier = self.governor.record(seconds)
+        if tier is not None:
+            self.apply_quality(tier)
+            budget = self.governor.budget * 1000
+            average = self.governor.changes[-1][2] * 1000
+            print(f"Quality: {QUALITY_TIERS[tier]['name']} (frames averaged {average:.1f} ms, budget {budget:.1f} ms)")
+
+    def change_airplane(self, type, player=0):
+        old = self.players[player]
+        airplane = Airplane(type, self.particles, self.player_bullets, self.balance, player)
+        airplane.rect.center = self.start_position(player)
+        airplane.score = old.score
+        airplane.health = old.health
+        old.kill()
+        self.all_sprites.add(airplane)
+        self.players[player] = airplane
+
+    def start_schedule(self):
+        # Obstacles and power-ups spawn on their own cadence from the start
+        scheduler = self.scheduler
+        scheduler.clear()
+        self.schedule_obstacle()
+        scheduler.every(POWERUP_INTERVAL, self.spawn_powerup, priority=1, first=self.tick + POWERUP_INTERVAL)
+        self.schedule_level_script()
+
+    def obstacle_interval(self):
+        balance = self.balance
+        return max(balance.obstacle_interval_min,
+                   balance.obstacle_interval - self.level * balance.obstacle_interval_per_level)
+
+    def schedule_obstacle(self):
+        # The gap to the next obstacle shrinks with the level it was scheduled at
+        self.obstacle_event = self.scheduler.at(self.tick + self.obstacle_interval(), self.spawn_scheduled_obstacle)
+
+    def spawn_scheduled_obstacle(self):
+        self.spawn_obstacle()
+        self.schedule_obstacle()
+
+    def spawn_obstacle(self):
+        self.lifecycle.spawn(Obstacle, (self.all_sprites, self.obstacles), self.level, self.rng, self.balance)
+
+    def spawn_powerup(self, powerup_type=None):
+        if powerup_type is None:
+            powerup_type = self.rng.choice(["health", "invincible", "speed"])
+        self.lifecycle.spawn(PowerUp, (self.all_sprites, self.powerups), powerup_type, self.rng)
+
+    def schedule_level_script(self):
+        actions = {"obstacle": self.spawn_obstacle, "powerup": self.spawn_powerup, "boss": self.spawn_boss}
+        for delay, action, *args in self.level_scripts.get(self.level, ()):
+            self.scheduler.at(self.tick + delay, actions[action], *args, priority=2)
+
+    def check_boss_spawn(self):
+        if not self.boss_active and self.team_score() >= self.boss_spawn_score:
+            self.spawn_boss()
+            self.boss_spawn_score += 5000
+
+    def spawn_boss(self):
+        if self.boss_active:
+            return
+        self.boss = Boss(self.level, self.boss_bullets, self.balance)
+        self.bosses_spawned += 1
+        self.all_sprites.add(self.boss)
+        self.boss_active = True
+        # Obstacles hold off while the boss fights, which fires a ring every second
+        self.scheduler.cancel(self.obstacle_event)
+        self.boss_fire_event = self.scheduler.every(BOSS_FIRE_INTERVAL, self.fire_boss, priority=3,
+                                                    first=self.tick + BOSS_FIRE_INTERVAL)
+
+    def fire_boss(self):
+        self.boss.shoot()
+
+    def remove_boss(self):
+        self.boss.kill()
+        self.boss.bullets.clear()
+        self.boss_active = False
+        self.scheduler.cancel(self.boss_fire_event)
+        self.schedule_obstacle()
+
+    def end_invincibility(self, player=0):
+        self.players[player].invincible = False
+
+    def end_speed_boost(self, player=0):
+        airplane = self.players[player]
+        airplane.speed = self.balance.airplane_stats[airplane.type][0]
+
+    def apply_loaded(self, outcomes):
+        for name, result, error in outcomes:
+            if name == "leaderboard":
+                if error:
+                    print(f"Leaderboard error: {error}")
+                else:
+                    self.high_score = max(self.high_score, result.high_score)
+            elif name == "sounds":
+                if error:
+                    print(f"Sound error: {error}")
+                    print("Game will run without sound effects")
+                    self.sounds_enabled = False
+                else:
+                    self.sounds = result
+        if outcomes and not self.loader.pending:
+            print(f"Assets loaded in {self.loader.seconds * 1000:.0f} ms")
+
+    def report_startup(self):
+        # Counts from Game(), benchmarks.startup also times the imports and
+        # the interpreter starting up
+        self.first_frame_seconds = time.perf_counter() - self.created
+        print(f"First frame {self.first_frame_seconds * 1000:.0f} ms after the game was created")
+
+    def play_sound(self, name):
+        sound = self.sounds.get(name)
+        if self.sounds_enabled and sound:
+            try:
+                sound.play()
+            except pygame.error:
+                pass
+
+    def build_collision_world(self):
+        # Register every entity kind for this frame's broad phase
+        world = self.collision_world
+        world.clear()
+        for airplane in self.players:
+            if airplane.alive():
+                world.add("player", airplane, airplane.rect)
+        for obstacle in self.obstacles:
+            world.add("obstacle", obstacle, obstacle.rect)
+        for powerup in self.powerups:
+            world.add("powerup", powerup, powerup.rect)
+        bullets = self.airplane.bullets
+        live = bullets.live
+        world.add_points("player_bullet", live, bullets.x[live], bullets.y[live])
+        if self.boss_active:
+            world.add("boss", self.boss, self.boss.rect)
+            bullets = self.boss.bullets
+            live = bullets.live
+            world.add_points("boss_bullet", live, bullets.x[live], bullets.y[live])
+        return world
+
+    def check_collisions(self):
+        # The broad phase compares rects, the masks then drop hits in the
+        # transparent corners of the airplane and round sprites
+        world = self.build_collision_world()
+        obstacle_hits = [pair for pair in world.pairs("player", "obstacle") if sprites_touch(*pair)]
+        boss_hits = []
+        bullet_hits = []
+        if self.boss_active:
+            boss_hits = [pair for pair in world.pairs("player", "boss") if sprites_touch(*pair)]
+            bullets = self.boss.bullets
+            bullet_hits = [(airplane, slot) for airplane, slot in world.pairs("player", "boss_bullet")
+                           if bullet_touches(airplane, bullets.x[slot], bullets.y[slot])]
+
+        for airplane in self.players:
+            if airplane.invincible or not airplane.alive():
+                continue
+
+            # Check obstacle collisions
+            hits = [obstacle for player, obstacle in obstacle_hits if player is airplane and obstacle.alive()]
+            if hits:
+                for obstacle in hits:
+                    self.lifecycle.release(obstacle)
+                airplane.health -= 20
+                self.damage_taken["obstacle"] += 20
+                self.play_sound("crash")
+                airplane.add_particles(RED)
+                if airplane.health <= 0:
+                    self.knock_out(airplane)
+
+            # Check boss collisions
+            if any(player is airplane for player, _ in boss_hits):
+                airplane.health -= 40
+                self.damage_taken["boss"] += 40
+                self.play_sound("crash")
+                airplane.add_particles(RED)
+                if airplane.health <= 0:
+                    self.knock_out(airplane)
+
+            # Check boss bullet collisions
+            if self.boss_active:
+                hits = [slot for player, slot in bullet_hits if player is airplane and self.boss.bullets.active[slot]]
+                self.boss.bullets.release(hits)
+                for _ in hits:
+                    airplane.health -= 10
+                    self.damage_taken["boss_bullet"] += 10
+                    self.play_sound("crash")
+                    airplane.add_particles(RED)
+                    if airplane.health <= 0:
+                        self.knock_out(airplane)
+
+        # Check powerup collisions
+        for airplane, powerup in world.pairs("player", "powerup"):
+            if not powerup.alive() or not sprites_touch(airplane, powerup):
+                continue
+            self.lifecycle.release(powerup)
+            player = airplane.player
+            if powerup.type == "health":
+                airplane.health = min(100, airplane.health + 20)
+                airplane.add_particles(GREEN)
+            elif powerup.type == "invincible":
+                airplane.invincible = True
+                # A second pickup restarts the effect rather than stacking
+                self.scheduler.cancel(self.invincible_events[player])
+                self.invincible_events[player] = self.scheduler.at(self.tick + INVINCIBLE_TICKS,
+                                                                   self.end_invincibility, player)
+                airplane.add_particles(YELLOW)
+            elif powerup.type == "speed":
+                airplane.speed = 8
+                self.scheduler.cancel(self.speed_events[player])
+                self.speed_events[player] = self.scheduler.at(self.tick + SPEED_BOOST_TICKS,
+                                                              self.end_speed_boost, player)
+                airplane.add_particles(PURPLE)
+            self.play_sound("powerup")
+
+        # Check bullet collisions with boss
+        if self.boss_active:
+            bullets = self.airplane.bullets
+            hits = [slot for slot, boss in world.pairs("player_bullet", "boss")
+                    if bullet_touches(boss, bullets.x[slot], bullets.y[slot])]
+            bullets.release(hits)
+            for _ in hits:
+                self.boss.health -= 10
+                if self.boss.health <= 0:
+                    self.remove_boss()
+                    self.bosses_killed += 1
+                    # The players share one bullet pool, every airplane still flying gets the reward
+                    for airplane in self.players:
+                        if airplane.alive():
+                            airplane.score += 1000
+                            airplane.add_particles(WHITE)
+                    break
+
+        # Check bullet collisions with obstacles
+        bullets = self.airplane.bullets
+        spent = []
+        for slot, obstacle in world.pairs("player_bullet", "obstacle"):
+            if not bullets.active[slot] or slot in spent or not obstacle.alive():
+                continue
+            if not bullet_touches(obstacle, bullets.x[slot], bullets.y[slot]):
+                continue
+            spent.append(slot)
+            obstacle.health -= 10
+            if obstacle.health <= 0:
+                self.lifecycle.release(obstacle)
+                self.particles.emit(obstacle.rect.centerx, obstacle.rect.centery, GREY)
+        bullets.release(spent)
+
+    def check_level_up(self):
+        if self.team_score() >= self.level_up_score:
+            self.level += 1
+            self.level_up_score += 1000
+            self.airplane.add_particles(WHITE)
+            self.schedule_level_script()
+
+    def reset_game(self):
+        self.game_over = False
+        for player, airplane in enumerate(self.players):
+            airplane.health = 100
+            airplane.score = 0
+            airplane.invincible = False
+            self.end_speed_boost(player)
+            if not airplane.alive():
+                self.all_sprites.add(airplane)
+        self.place_players()
+        self.level = 1
+        self.level_up_score = 1000
+        self.boss_active = False
+        self.boss_spawn_score = 5000
+        self.bosses_spawned = 0
+        self.bosses_killed = 0
+        self.damage_taken = {"obstacle": 0, "boss": 0, "boss_bullet": 0}
+        if self.boss:
+            self.boss.kill()
+        self.boss_bullets.clear()
+        self.lifecycle.clear(self.obstacles)
+        self.lifecycle.clear(self.powerups)
+        if self.history is not None:
+            # Rewinding must not lead back into the run that just ended
+            self.history.clear()
+        self.start_schedule()
+
+    def reclaim_offscreen(self):
+        # Entities that scrolled off the left edge go back to their pools
+        self.lifecycle.sweep(self.obstacles)
+        self.lifecycle.sweep(self.powerups)
+        if self.boss_active and self.boss.rect.right < 0:
+            # The boss got past the player, it leaves without a reward
+            self.remove_boss()
+
+    def apply_controls(self, controls, player=0):
+        # Airplane switches travel in the input bitmask so recordings replay them
+        if not self.players[player].alive():
+            return
+        if controls & INPUT_DEFAULT:
+            self.change_airplane("default", player)
+        elif controls & INPUT_FAST:
+            self.change_airplane("fast", player)
+        elif controls & INPUT_TANK:
+            self.change_airplane("tank", player)
+        self.players[player].controls = controls
+
+    def update(self):
+        if not self.game_over:
+            # tick numbers the update in progress, scheduled events key off it
+            self.tick += 1
+            profiler = self.profiler
+            controls = self.controller.poll() | self.pending_controls
+            self.pending_controls = 0
+            if self.recorder:
+                self.recorder.record(controls)
+            self.apply_controls(controls)
+            for player in range(1, len(self.players)):
+                self.apply_controls(self.partner_controller.poll(), player)
+            profiler.mark("controls")
+
+            # The players share one bullet pool, it moves before anyone shoots
+            self.player_bullets.update()
+            self.all_sprites.update()
+            self.reclaim_offscreen()
+            profiler.mark("sprites")
+            self.particles.update()
+            profiler.mark("particles")
+            self.scheduler.run(self.tick)
+            self.check_boss_spawn()
+            profiler.mark("spawning")
+            self.check_collisions()
+            profiler.mark("collisions")
+            self.check_level_up()
+            for airplane in self.players:
+                if airplane.alive():
+                    airplane.score += 1
+
+            if self.recorder:
+                if self.game_over:
+                    self.recorder.stop(self.tick, self.airplane.score, self.airplane.health)
+                else:
+                    self.recorder.checkpoint(self.tick, self.airplane.score, self.airplane.health)
+            profiler.mark("rules")
+
+    def pack_counters(self):
+        damage = self.damage_taken
+        parts = [GAME_STATE.pack(
+            self.tick, self.seed, self.level, self.level_up_score, self.boss_spawn_score,
+            self.boss_active, self.game_over, self.bosses_spawned, self.bosses_killed,
+            damage["obstacle"], damage["boss"], damage["boss_bullet"], self.pending_controls,
+        )]
+        for airplane in self.players:
+            parts.append(AIRPLANE_STATE.pack(
+                AIRPLANE_TYPES.index(airplane.type), airplane.controls, airplane.speed, airplane.health,
+                airplane.score, airplane.invincible, airplane.shoot_timer,
+            ))
+        return b"".join(parts)
+
+    def unpack_counters(self, data):
+        (self.tick, self.seed, self.level, self.level_up_score, self.boss_spawn_score,
+         self.boss_active, self.game_over, self.bosses_spawned, self.bosses_killed,
+         obstacle_damage, boss_damage, bullet_damage, self.pending_controls) = GAME_STATE.unpack_from(data)
+        self.damage_taken = {"obstacle": obstacle_damage, "boss": boss_damage, "boss_bullet": bullet_damage}
+        states = list(AIRPLANE_STATE.iter_unpack(data[GAME_STATE.size:]))
+        if len(states) != len(self.players):
+            raise ValueError(f"Snapshot is for {len(states)} players, this game has {len(self.players)}")
+        for player, (type, controls, speed, health, score, invincible, shoot_timer) in enumerate(states):
+            airplane = self.players[player]
+            if airplane.type != AIRPLANE_TYPES[type]:
+                airplane.kill()
+                airplane = self.players[player] = Airplane(AIRPLANE_TYPES[type], self.particles,
+                                                           self.player_bullets, self.balance, player)
+            airplane.controls = controls
+            airplane.speed = speed
+            airplane.health = health
+            airplane.score = score
+            airplane.invincible = invincible
+            airplane.shoot_timer = shoot_timer
+            self.high_score = max(self.high_score, score)
+
+    def pack_sprites(self):
+        sprites = []
+        for sprite in self.all_sprites:
+            x, y = sprite.rect.topleft
+            if sprite.__class__ is Airplane:
+                sprites.append(SPRITE_STATE.pack(SPRITE_AIRPLANE, x, y, 0, sprite.player, 0))
+            elif sprite is self.boss:
+                sprites.append(SPRITE_STATE.pack(SPRITE_BOSS, x, y, sprite.speed, sprite.health, sprite.move_direction))
+            elif sprite.__class__ is Obstacle:
+                sprites.append(SPRITE_STATE.pack(SPRITE_OBSTACLE, x, y, sprite.speed, sprite.health, 0))
+            else:
+                sprites.append(SPRITE_STATE.pack(SPRITE_POWERUP, x, y, sprite.speed, POWERUP_TYPES.index(sprite.type), 0))
+        return b"".join(sprites)
+
+    def unpack_sprites(self, data):
+        # Rebuild the sprite groups in their saved order, the order sprites
+        # update and collide in. Airplanes missing from it were knocked out.
+        for airplane in self.players:
+            airplane.kill()
+        if self.boss:
+            self.boss.kill()
+            self.boss = None
+        self.lifecycle.clear(self.obstacles)
+        self.lifecycle.clear(self.powerups)
+        for kind, x, y, speed, value, direction in SPRITE_STATE.iter_unpack(data):
+            if kind == SPRITE_AIRPLANE:
+                sprite = self.players[value]
+                self.all_sprites.add(sprite)
+                sprite.rect.topleft = (x, y)
+                continue
+            if kind == SPRITE_BOSS:
+                sprite = self.boss = Boss(self.level, self.boss_bullets, self.balance)
+                sprite.health = value
+                sprite.move_direction = direction
+                self.all_sprites.add(sprite)
+            elif kind == SPRITE_OBSTACLE:
+                sprite = self.lifecycle.spawn(Obstacle, (self.all_sprites, self.obstacles),
+                                              self.level, self.rng, self.balance)
+                sprite.health = value
+            else:
+                sprite = self.lifecycle.spawn(PowerUp, (self.all_sprites, self.powerups), POWERUP_TYPES[value], self.rng)
+            sprite.rect.topleft = (x, y)
+            sprite.speed = speed
+        self.previous_positions = {}
+        if self.renderer:
+            self.renderer.invalidate()
+
+    def save_state(self):
+        # The whole simulation as a compact binary snapshot, see snapshot.py
+        events = (self.obstacle_event, self.boss_fire_event, *self.invincible_events, *self.speed_events)
+        return snapshot.join((
+            self.pack_counters(),
+            snapshot.pack_random(self.rng),
+            self.scheduler.pack(self, events),
+            self.pack_sprites(),
+            self.player_bullets.pack(),
+            self.boss_bullets.pack(),
+            self.particles.pack(),
+        ))
+
+    def load_state(self, data):
+        counters, rng, events, sprites, player_bullets, boss_bullets, particles = snapshot.split(data)
+        self.unpack_counters(counters)
+        self.unpack_sprites(sprites)
+        players = len(self.players)
+        events = self.scheduler.unpack(events, self, 2 + 2 * players)
+        self.obstacle_event, self.boss_fire_event = events[:2]
+        self.invincible_events = events[2:2 + players]
+        self.speed_events = events[2 + players:]
+        self.player_bullets.unpack(player_bullets)
+        self.boss_bullets.unpack(boss_bullets)
+        self.particles.unpack(particles)
+        # Last, since respawning sprites above drew from the generator
+        snapshot.unpack_random(self.rng, rng)
+
+    def network_state(self):
+        # What a network client needs to show the game, see netplay.py
+        return snapshot.join((
+            self.pack_counters(),
+            self.pack_sprites(),
+            self.player_bullets.pack(),
+            self.boss_bullets.pack(),
+        ))
+
+    def load_network_state(self, data):
+        counters, sprites, player_bullets, boss_bullets = snapshot.split(data)
+        self.unpack_counters(counters)
+        self.unpack_sprites(sprites)
+        self.player_bullets.unpack(player_bullets)
+        self.boss_bullets.unpack(boss_bullets)
+
+    def remember(self):
+        # Windowed games snapshot every tick so they can rewind
+        if self.history is not None and self.tick != self.history.tick:
+            self.history.push(self.tick, self.save_state())
+
+    def rewind(self):
+        # Goes back one tick, returns False once the history runs out
+        data = self.history.pop()
+        if data is None:
+            return False
+        if GAME_STATE.unpack_from(snapshot.split(data)[0])[6]:
+            # Never rewind into a run that has already ended
+            self.history.clear()
+            return False
+        self.load_state(data)
+        if self.recorder:
+            self.recorder.rewind(self.tick)
+        return True
+
+    def quick_save(self, path=QUICKSAVE_FILE):
+        try:
+            snapshot.save(path, self.save_state(), self.tick)
+        except OSError as e:
+            print(f"Quick save error: {e}")
+            return
+        print(f"Saved tick {self.tick} to {path}")
+
+    def quick_load(self, path=QUICKSAVE_FILE):
+        if self.game_over:
+            print("Quick load is off once the run is over, press R to restart first")
+            return False
+        try:
+            data, tick = snapshot.load(path)
+        except (OSError, ValueError) as e:
+            print(f"Quick load error: {e}")
+            return False
+        if self.recorder and not self.recorder.stopped:
+            # The inputs that led to the loaded state were never recorded
+            self.recorder.stop(self.tick, self.airplane.score, self.airplane.health)
+            print("Recording stopped at quick load")
+        self.load_state(data)
+        if self.history is not None:
+            self.history.clear()
+            self.history.push(self.tick, data)
+        print(f"Loaded tick {tick} from {path}")
+        return True
+
+    def step(self):
+        # One simulation tick, remembering where sprites were so draw can interpolate
+        self.previous_positions = {sprite: sprite.rect.topleft for sprite in self.all_sprites}
+        self.update()
+
+    def draw(self, alpha=1.0, scroll=1.0):
+        # alpha is how far we are between the last two ticks, scroll is how
+        # many ticks of real time have passed since the last draw
+        profiler = self.profiler
+        canvas = self.canvas or self.screen
+        if self.renderer:
+            self.renderer.begin_frame(scroll)
+        else:
+            # Draw cached gradient and parallax star layers
+            self.background.draw(canvas, scroll)
+        profiler.mark("background")
+
+        drawn = self.draw_scene(canvas, alpha, self.render_scale)
+        if canvas is not self.screen:
+            # Low quality tiers render smaller and upscale to the window
+            pygame.transform.scale(canvas, self.screen.get_size(), self.screen)
+
+        # The HUD is always drawn at full resolution
+        drawn += self.hud.draw(self.screen, self)
+        profiler.mark("scene")
+
+        if profiler.visible:
+            drawn.append(profiler.draw(self.screen))
+            profiler.mark("profiler")
+
+        if self.renderer:
+            self.renderer.end_frame(drawn)
+        else:
+            pygame.display.flip()
+        profiler.mark("display")
+
+    def sprite_position(self, sprite, alpha):
+        x, y = sprite.rect.topleft
+        previous = self.previous_positions.get(sprite)
+        if previous is None or alpha >= 1.0:
+            return x, y
+        if abs(x - previous[0]) > TELEPORT_DISTANCE or abs(y - previous[1]) > TELEPORT_DISTANCE:
+            return x, y
+        return (round(previous[0] + (x - previous[0]) * alpha),
+                round(previous[1] + (y - previous[1]) * alpha))
+
+    def scaled_image(self, image, scale):
+        scaled = self.scaled_images.get(image)
+        if scaled is None:
+            width, height = image.get_size()
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            scaled = self.scaled_images[image] = pygame.transform.smoothscale(image, size)
+        return scaled
+
+    def draw_scene(self, canvas, alpha=1.0, scale=1.0):
+        # Draws the sprites, particles and bullets, returning the rects they touched
+        if scale == 1.0:
+            drawn = canvas.blits([
+                (sprite.image, self.sprite_position(sprite, alpha)) for sprite in self.all_sprites
+            ])
+        else:
+            drawn = []
+            for sprite in self.all_sprites:
+                x, y = self.sprite_position(sprite, alpha)
+                drawn.append(canvas.blit(self.scaled_image(sprite.image, scale), (round(x * scale), round(y * scale))))
+        drawn += self.particles.draw(canvas, alpha, scale)
+        drawn += self.airplane.bullets.draw(canvas, alpha, scale)
+        if self.boss_active:
+            drawn += self.boss.bullets.draw(canvas, alpha, scale)
+        return drawn
+
+    def run(self):
+        # Fixed timestep: the simulation always advances in TICK_SECONDS steps,
+        # however fast or slow frames are drawn, and draws interpolate between ticks
+        previous = time.perf_counter()
+        accumulator = 0.0
+        while self.running:
+            now = time.perf_counter()
+            elapsed = now - previous
+            previous = now
+            accumulator += elapsed
+
+            self.profiler.begin_frame()
+            self.handle_events()
+            self.profiler.mark("events")
+            ticks = 0
+            while accumulator >= TICK_SECONDS and ticks < MAX_CATCH_UP_TICKS:
+                if self.rewinding:
+                    self.rewind()
+                elif self.net:
+                    self.net.step()
+                else:
+                    self.step()
+                    self.remember()
+                accumulator -= TICK_SECONDS
+                ticks += 1
+            if accumulator >= TICK_SECONDS:
+                # Too far behind to catch up, drop the backlog instead of spiralling
+                accumulator = 0.0
+
+            self.draw(accumulator / TICK_SECONDS, elapsed / TICK_SECONDS)
+            if self.governor:
+                # Time spent on this frame, not counting the frame cap's sleep
+                self.govern_quality(time.perf_counter() - now)
+            if self.first_frame_seconds is None:
+                self.report_startup()
+            if self.loader.pending:
+                self.apply_loaded(self.loader.poll())
+            if self.profiler.enabled:
+                self.profiler.end_frame(self.entity_counts())
+            if self.render_fps:
+                self.clock.tick(self.render_fps)
+
+    def run_headless(self, frames, restart=False):
+        # Step the simulation as fast as possible, no events, drawing or frame cap
+        games = 1
+        frame = 0
+        start = time.perf_counter()
+        while frame < frames:
+            if self.game_over:
+                if not restart:
+                    break
+                self.reset_game()
+                games += 1
+            self.update()
+            frame += 1
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": frame,
+            "seconds": elapsed,
+            "fps": frame / elapsed if elapsed > 0 else 0.0,
+            "games": games,
+            "score": self.airplane.score,
+            "health": self.airplane.health,
+            "level": self.level,
+            "high_score": self.high_score,
+            "game_over": self.game_over,
+        }
+
+def run_replay(recording):
+    # Re-run a recording headless at full speed and check it reproduces the
+    # recorded score and health at every checkpoint
+    game = Game(headless=True, controller=ReplayController(recording), seed=recording.seed)
+    expected = {frame: (score, health) for frame, score, health in recording.checkpoints}
+    mismatch = None
+    start = time.perf_counter()
+    for _ in range(recording.frames):
+        game.update()
+        wanted = expected.get(game.tick)
+        if wanted is not None and wanted != (game.airplane.score, game.airplane.health):
+            mismatch = (game.tick, wanted, (game.airplane.score, game.airplane.health))
+            break
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": game.tick,
+        "seconds": elapsed,
+        "fps": game.tick / elapsed if elapsed > 0 else 0.0,
+        "score": game.airplane.score,
+        "health": game.airplane.health,
+        "level": game.level,
+        "game_over": game.game_over,
+        "mismatch": mismatch,
+    }
+
+def find_divergence(recording):
+    # Runs a recording twice side by side, comparing full snapshots every
+    # tick. Returns the first tick the runs differ and the sections that
+    # differ, or None if they never do, which means a replay desync comes
+    # from the recording machine rather than hidden state in the simulation
+    games = [Game(headless=True, controller=ReplayController(recording), seed=recording.seed) for _ in range(2)]
+    for _ in range(recording.frames):
+        for game in games:
+            game.update()
+        first, second = (game.save_state() for game in games)
+        if first != second:
+            return games[0].tick, [SNAPSHOT_SECTIONS[i] for i in snapshot.diff(first, second)]
+    return None
+
+def print_leaderboard(leaderboard, which="all"):
+    if which in AIRPLANE_COLORS:
+        runs = leaderboard.top(airplane=which)
+    elif which.isdigit():
+        runs = leaderboard.top(level=int(which))
+    elif which != "all":
+        runs = leaderboard.top(date=which)
+    else:
+        runs = leaderboard.top()
+    print(f"Best runs ({which}), {leaderboard.runs} recorded, high score {leaderboard.high_score}")
+    for rank, run in enumerate(runs, 1):
+        print(f"{rank:>3}. {run['score']:>8}  {run['airplane']:<8} level {run['level']:<3} {run['date']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Airplane Game")
+    parser.add_argument("--headless", action="store_true", help="run the simulation without a window or sound")
+    parser.add_argument("--frames", type=int, default=100000, help="frames to simulate in headless mode")
+    parser.add_argument("--seed", type=int, help="random seed for the simulation")
+    parser.add_argument("--controller", choices=["random", "idle"], default="random", help="input controller in headless mode")
+    parser.add_argument("--restart", action="store_true", help="start a new game after game over in headless mode")
+    parser.add_argument("--dirty-rects", action="store_true", help="only update the changed parts of the screen each frame")
+    parser.add_argument("--render-fps", type=int, default=RENDER_FPS, help="frame rate cap for drawing, 0 for uncapped")
+    parser.add_argument("--record", metavar="FILE", help="record the inputs of the first game to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recording headless and verify its score and health")
+    parser.add_argument("--check-determinism", action="store_true",
+                        help="with --replay, run the recording twice and report the first tick their states differ")
+    parser.add_argument("--resume", nargs="?", const=QUICKSAVE_FILE, metavar="FILE",
+                        help=f"start from a quick save (default {QUICKSAVE_FILE})")
+    parser.add_argument("--host", nargs="?", const=DEFAULT_PORT, type=int, metavar="PORT",
+                        help=f"host a two player game, listening on PORT (default {DEFAULT_PORT})")
+    parser.add_argument("--join", metavar="ADDRESS", help="join a two player game at HOST[:PORT]")
+    parser.add_argument("--quality", choices=["auto"] + [tier["name"] for tier in QUALITY_TIERS], default="auto",
+                        help="drawing quality, auto adapts it to hold --target-fps")
+    parser.add_argument("--target-fps", type=int, default=FPS, help="frame rate the quality governor aims for")
+    parser.add_argument("--profile-csv", metavar="FILE", help="stream per-phase frame timings to a CSV file")
+    parser.add_argument("--leaderboard", nargs="?", const="all", metavar="FILTER",
+                        help="print the best runs, optionally only for an airplane type, level or date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    if (args.host or args.join) and (args.headless or args.record or args.resume):
+        parser.error("--host and --join cannot be combined with --headless, --record or --resume")
+    if args.host is not None and not 0 < args.host < 65536:
+        parser.error(f"--host {args.host} is not a port number")
+    if args.join:
+        try:
+            address = parse_address(args.join)
+        except ValueError as e:
+            parser.error(f"--join {args.join}: {e}")
+    if args.resume and args.record:
+        # Loading the quick save stops the recording before its first tick
+        parser.error("--resume cannot be combined with --record")
+
+    if args.leaderboard:
+        print_leaderboard(ScoreStore().load(), args.leaderboard)
+        sys.exit()
+
+    if args.replay:
+        recording = Recording.load(args.replay)
+        if args.check_determinism:
+            divergence = find_divergence(recording)
+            pygame.quit()
+            if divergence:
+                tick, sections = divergence
+                print(f"Runs diverge at tick {tick} in: {', '.join(sections)}")
+                sys.exit(1)
+            print(f"Both runs match for all {recording.frames} frames")
+            sys.exit()
+        result = run_replay(recording)
+        print(f"Frames: {result['frames']} in {result['seconds']:.2f}s ({result['fps']:.0f} FPS)")
+        print(f"Score: {result['score']}  Health: {result['health']}  Level: {result['level']}")
+        if result["mismatch"]:
+            frame, wanted, got = result["mismatch"]
+            print(f"Desync at frame {frame}: expected score/health {wanted}, got {got}")
+            pygame.quit()
+            sys.exit(1)
+        print("Replay matches the recording")
+        pygame.quit()
+        sys.exit()
+
+    seed = random.randrange(2 ** 32) if args.seed is None else args.seed
+    recorder = Recorder(seed) if args.record else None
+
+    if args.headless:
+        if args.controller == "random":
+            controller = RandomController(seed)
+        else:
+            controller = IdleController()
+        game = Game(headless=True, controller=controller, seed=seed, recorder=recorder)
+        if args.resume and not game.quick_load(args.resume):
+            sys.exit(1)
+        stats = game.run_headless(args.frames, restart=args.restart)
+        print(f"Frames: {stats['frames']} in {stats['seconds']:.2f}s ({stats['fps']:.0f} FPS)")
+        print(f"Games: {stats['games']}")
+        print(f"Score: {stats['score']}  Health: {stats['health']}  Level: {stats['level']}")
+        print(f"High Score: {stats['high_score']}  Game Over: {stats['game_over']}")
+    else:
+        players = 2 if args.host or args.join else 1
+        game = Game(dirty_rects=args.dirty_rects, render_fps=args.render_fps, seed=seed, recorder=recorder,
+                    profile_csv=args.profile_csv, quality=args.quality, target_fps=args.target_fps,
+                    players=players)
+        if args.resume and not game.quick_load(args.resume):
+            sys.exit(1)
+        if args.host:
+            try:
+                NetHost(game, args.host)
+            except OSError as e:
+                print(f"Cannot host on port {args.host}: {e}")
+                pygame.quit()
+                sys.exit(1)
+            print(f"Hosting on port {args.host}, waiting for player 2")
+        elif args.join:
+            NetClient(game, address)
+            print(f"Joining {args.join}")
+        game.run()
+        if game.net:
+            print(game.net.summary())
+            game.net.close()
+        if game.profiler.enabled:
+            game.profiler.close()
+        game.scores.close()
+
+    if recorder:
+        recorder.stop(game.tick, game.airplane.score, game.airplane.health)
+        recorder.save(args.record)
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import random
+
+import pygame
+
+# (star count, scroll speed in pixels per frame, min brightness, max brightness)
+STAR_LAYERS = (
+    (30, 0.25, 60, 120),
+    (15, 0.5, 120, 190),
+    (8, 1.0, 190, 255),
+)
+
+class StarLayer:
+    def __init__(self, width, height, count, speed, min_brightness, max_brightness, rng):
+        self.speed = speed
+        self.offset = 0.0
+        # Star positions are fixed once, baked into a tile that wraps horizontally
+        self.stars = [
+            (rng.randrange(width), rng.randrange(height), rng.randint(min_brightness, max_brightness))
+            for _ in range(count)
+        ]
+        self.image = pygame.Surface((width, height))
+        self.image.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        for x, y, brightness in self.stars:
+            pygame.draw.circle(self.image, (brightness, brightness, brightness), (x, y), 1)
+
+    def scroll(self, frames=1.0):
+        # Returns the rects of stars that moved on screen, at their old and new positions
+        width = self.image.get_width()
+        old_x = -int(self.offset)
+        self.offset = (self.offset + self.speed * frames) % width
+        new_x = -int(self.offset)
+        if old_x == new_x:
+            return []
+        rects = []
+        for x, y, _ in self.stars:
+            rects.append(pygame.Rect((x + old_x) % width - 2, y - 2, 5, 5))
+            rects.append(pygame.Rect((x + new_x) % width - 2, y - 2, 5, 5))
+        return rects
+
+    def draw(self, screen):
+        width = self.image.get_width()
+        x = -int(self.offset)
+        screen.blit(self.image, (x, 0))
+        screen.blit(self.image, (x + width, 0))
+
+    def restore(self, screen, rect):
+        width = self.image.get_width()
+        x = -int(self.offset)
+        screen.blit(self.image, rect.topleft, rect.move(-x, 0))
+        screen.blit(self.image, rect.topleft, rect.move(-x - width, 0))
+
+class Background:
+    def __init__(self, width, height, layers=STAR_LAYERS, seed=None):
+        self.layer_specs = layers
+        # Own RNG so the star field never disturbs gameplay randomness
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.size = None
+        self.build(width, height)
+
+    def build(self, width, height):
+        self.size = (width, height)
+
+        # Render the vertical gradient once as a 1 pixel wide strip, then stretch it
+        strip = pygame.Surface((1, height))
+        for y in range(height):
+            strip.set_at((0, y), (0, 0, max(0, min(255, y // 2))))
+        self.gradient = pygame.transform.scale(strip, (width, height))
+
+        rng = random.Random(self.seed)
+        self.layers = [StarLayer(width, height, *spec, rng) for spec in self.layer_specs]
+
+        if pygame.display.get_surface() is not None:
+            self.gradient = self.gradient.convert()
+            for layer in self.layers:
+                layer.image = layer.image.convert()
+
+    def set_layers(self, layers, size=None):
+        # Rebuilds the star field, e.g. when the quality tier changes
+        size = size or self.size
+        if layers != self.layer_specs or size != self.size:
+            self.layer_specs = layers
+            self.build(*size)
+
+    def scroll(self, frames=1.0):
+        # frames is how many 60 Hz frames of motion to advance by
+        rects = []
+        for layer in self.layers:
+            rects.extend(layer.scroll(frames))
+        return rects
+
+    def draw(self, screen, frames=1.0):
+        if screen.get_size() != self.size:
+            self.build(*screen.get_size())
+        self.scroll(frames)
+        screen.blit(self.gradient, (0, 0))
+        for layer in self.layers:
+            layer.draw(screen)
+
+    def restore(self, screen, rect):
+        # Repaint just the background under rect, at the current scroll position
+        screen.blit(self.gradient, rect.topleft, rect)
+        for layer in self.layers:
+            layer.restore(screen, rect)
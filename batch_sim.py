@@ -0,0 +1,236 @@
+# Balance sweep runner.
+#
+#     python batch_sim.py --games 200 --levels 1 5 10 --out runs.csv
+#
+# Plays thousands of headless games across a process pool (one worker per
+# core by default). Each game is one airplane type, one starting level, one
+# bot policy and one set of Balance overrides. Every finished game is
+# streamed to the --out CSV as it arrives, and per-configuration averages are
+# written to --summary at the end.
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from airplane_game import (
+    INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_SHOOT, INPUT_UP, SCREEN_HEIGHT,
+    SCREEN_WIDTH, Balance, Game, IdleController, RandomController,
+)
+
+FIELDS = [
+    "airplane", "start_level", "policy", "overrides", "seed",
+    "frames", "score", "level", "game_over",
+    "bosses_spawned", "bosses_killed",
+    "damage_obstacle", "damage_boss", "damage_boss_bullet",
+]
+
+SUMMARY_FIELDS = [
+    "airplane", "start_level", "policy", "overrides", "games",
+    "mean_frames", "mean_score", "mean_level", "death_rate", "boss_kill_rate",
+    "damage_obstacle", "damage_boss", "damage_boss_bullet",
+]
+
+class DodgeBot:
+    # Keeps shooting, sidesteps whatever is closest in front of it and
+    # otherwise lines up with the boss
+    def __init__(self, game, look_ahead=220):
+        self.game = game
+        self.look_ahead = look_ahead
+
+    def threats(self):
+        game = self.game
+        plane = game.airplane.rect
+        for obstacle in game.obstacles:
+            rect = obstacle.rect
+            if rect.right > plane.left and rect.left - plane.right < self.look_ahead:
+                yield rect.centerx, rect.centery, rect.height // 2 + 20
+        if game.boss_active:
+            rect = game.boss.rect
+            if rect.right > plane.left and rect.left - plane.right < 120:
+                yield rect.centerx, rect.centery, rect.height // 2 + 20
+            bullets = game.boss.bullets
+            live = bullets.live
+            for x, y in zip(bullets.x[live].tolist(), bullets.y[live].tolist()):
+                if abs(x - plane.centerx) < 90:
+                    yield x, y, 25
+
+    def poll(self):
+        game = self.game
+        plane = game.airplane.rect
+        controls = INPUT_SHOOT
+
+        nearest = None
+        for x, y, reach in self.threats():
+            gap = abs(y - plane.centery) - reach - plane.height // 2
+            if gap < 0 and (nearest is None or x < nearest[0]):
+                nearest = (x, y)
+
+        if nearest is not None:
+            # Step out of the threat's lane, away from the screen edge if cornered
+            if nearest[1] >= plane.centery and plane.top > 10:
+                controls |= INPUT_UP
+            elif plane.bottom < SCREEN_HEIGHT - 10:
+                controls |= INPUT_DOWN
+            else:
+                controls |= INPUT_UP
+            if plane.left > 40:
+                controls |= INPUT_LEFT
+        else:
+            target = game.boss.rect.centery if game.boss_active else SCREEN_HEIGHT // 2
+            if target < plane.centery - 10:
+                controls |= INPUT_UP
+            elif target > plane.centery + 10:
+                controls |= INPUT_DOWN
+            if plane.centerx < SCREEN_WIDTH // 4:
+                controls |= INPUT_RIGHT
+        return controls
+
+POLICIES = {
+    "dodge": lambda game, seed: DodgeBot(game),
+    "random": lambda game, seed: RandomController(seed),
+    "idle": lambda game, seed: IdleController(),
+}
+
+def play(task):
+    airplane, start_level, policy, overrides, seed, max_frames = task
+    game = Game(headless=True, controller=IdleController(), seed=seed, balance=Balance(**overrides))
+    game.controller = POLICIES[policy](game, seed)
+    if airplane != "default":
+        game.change_airplane(airplane)
+        game.airplane.health = game.balance.airplane_stats[airplane][1]
+    game.level = start_level
+    game.run_headless(max_frames)
+    return {
+        "airplane": airplane,
+        "start_level": start_level,
+        "policy": policy,
+        "overrides": format_overrides(overrides),
+        "seed": seed,
+        "frames": game.tick,
+        "score": game.airplane.score,
+        "level": game.level,
+        "game_over": int(game.game_over),
+        "bosses_spawned": game.bosses_spawned,
+        "bosses_killed": game.bosses_killed,
+        "damage_obstacle": game.damage_taken["obstacle"],
+        "damage_boss": game.damage_taken["boss"],
+        "damage_boss_bullet": game.damage_taken["boss_bullet"],
+    }
+
+def parse_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+def format_overrides(overrides):
+    return " ".join(f"{name}={value}" for name, value in sorted(overrides.items()))
+
+def parameter_sets(fixed, sweeps):
+    # Cartesian product of every --sweep on top of the --set values
+    names = [name for name, _ in sweeps]
+    for values in itertools.product(*(values for _, values in sweeps)):
+        overrides = dict(fixed)
+        overrides.update(zip(names, values))
+        yield overrides
+
+def build_tasks(args):
+    fixed = {}
+    for item in args.set:
+        name, value = item.split("=", 1)
+        fixed[name] = parse_value(value)
+    sweeps = []
+    for item in args.sweep:
+        name, values = item.split("=", 1)
+        sweeps.append((name, [parse_value(value) for value in values.split(",")]))
+
+    tasks = []
+    seed = args.seed
+    for overrides in parameter_sets(fixed, sweeps):
+        Balance(**overrides)  # fail fast on a misspelled setting
+        for airplane in args.types:
+            for level in args.levels:
+                for _ in range(args.games):
+                    tasks.append((airplane, level, args.policy, overrides, seed, args.frames))
+                    seed += 1
+    return tasks
+
+class Summary:
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, row):
+        key = (row["airplane"], row["start_level"], row["policy"], row["overrides"])
+        totals = self.groups.setdefault(key, dict.fromkeys(FIELDS[5:], 0) | {"games": 0})
+        totals["games"] += 1
+        for field in FIELDS[5:]:
+            totals[field] += row[field]
+
+    def rows(self):
+        for (airplane, level, policy, overrides), totals in sorted(self.groups.items()):
+            games = totals["games"]
+            damage = totals["damage_obstacle"] + totals["damage_boss"] + totals["damage_boss_bullet"]
+            yield {
+                "airplane": airplane,
+                "start_level": level,
+                "policy": policy,
+                "overrides": overrides,
+                "games": games,
+                "mean_frames": totals["frames"] / games,
+                "mean_score": totals["score"] / games,
+                "mean_level": totals["level"] / games,
+                "death_rate": totals["game_over"] / games,
+                "boss_kill_rate": totals["bosses_killed"] / totals["bosses_spawned"] if totals["bosses_spawned"] else 0.0,
+                "damage_obstacle": totals["damage_obstacle"] / damage if damage else 0.0,
+                "damage_boss": totals["damage_boss"] / damage if damage else 0.0,
+                "damage_boss_bullet": totals["damage_boss_bullet"] / damage if damage else 0.0,
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless games in parallel for balance sweeps")
+    parser.add_argument("--types", nargs="+", default=["default", "fast", "tank"], choices=["default", "fast", "tank"])
+    parser.add_argument("--levels", nargs="+", type=int, default=[1], help="starting levels to test")
+    parser.add_argument("--games", type=int, default=100, help="games per airplane, level and parameter set")
+    parser.add_argument("--frames", type=int, default=36000, help="frame limit per game")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="dodge", help="bot that plays the games")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a Balance setting")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NAME=V1,V2,...", help="try each value of a Balance setting")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up from it")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--out", default="balance_runs.csv", help="CSV file for per-game results")
+    parser.add_argument("--summary", default="balance_summary.csv", help="CSV file for per-configuration averages")
+    args = parser.parse_args()
+
+    tasks = build_tasks(args)
+    summary = Summary()
+    start = time.perf_counter()
+    frames = 0
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+    print(f"Playing {len(tasks)} games on {args.workers} workers")
+    with open(args.out, "w", newline="") as f, ProcessPoolExecutor(args.workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for done, row in enumerate(pool.map(play, tasks, chunksize=chunksize), 1):
+            writer.writerow(row)
+            summary.add(row)
+            frames += row["frames"]
+            if done % 100 == 0:
+                f.flush()
+                elapsed = time.perf_counter() - start
+                print(f"{done}/{len(tasks)} games, {frames / elapsed:.0f} frames/s")
+
+    with open(args.summary, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summary.rows())
+
+    elapsed = time.perf_counter() - start
+    print(f"Played {len(tasks)} games ({frames} frames) in {elapsed:.1f}s")
+    print(f"Results: {args.out}  Summary: {args.summary}")
+
+if __name__ == "__main__":
+    main()
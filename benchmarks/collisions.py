@@ -0,0 +1,86 @@
+# Broad phase scaling benchmark.
+#
+#     python -m benchmarks.collisions
+#
+# Scatters obstacles and bullets over a field whose area grows with the
+# entity count (so density stays game-like), then times one frame's
+# bullet <-> obstacle and player <-> obstacle queries three ways: the naive
+# Python double loop, pygame's C collidelist per bullet, and the spatial hash
+# (including the cost of rebuilding it every frame).
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+import pygame
+
+from collision import SpatialHash
+
+def build_scene(count, rng):
+    side = int(math.sqrt(count) * 80)
+    obstacles = [pygame.Rect(rng.randrange(side), rng.randrange(side), 40, 40) for _ in range(count)]
+    bullet_x = np.array([rng.uniform(0, side) for _ in range(count)], dtype=np.float32)
+    bullet_y = np.array([rng.uniform(0, side) for _ in range(count)], dtype=np.float32)
+    player = pygame.Rect(side // 2, side // 2, 50, 30)
+    return obstacles, bullet_x, bullet_y, player
+
+def naive(obstacles, bullet_x, bullet_y, player):
+    hits = []
+    for i, (x, y) in enumerate(zip(bullet_x.tolist(), bullet_y.tolist())):
+        for obstacle in obstacles:
+            if obstacle.collidepoint(x, y):
+                hits.append((i, obstacle))
+    player_hits = [obstacle for obstacle in obstacles if player.colliderect(obstacle)]
+    return len(hits), len(player_hits)
+
+def collidelist(obstacles, bullet_x, bullet_y, player):
+    hits = 0
+    for x, y in zip(bullet_x.tolist(), bullet_y.tolist()):
+        hits += len(pygame.Rect(int(x), int(y), 1, 1).collidelistall(obstacles))
+    return hits, len(player.collidelistall(obstacles))
+
+def spatial_hash(obstacles, bullet_x, bullet_y, player, world):
+    world.clear()
+    world.add("player", None, player)
+    for obstacle in obstacles:
+        world.add("obstacle", obstacle, obstacle)
+    world.add_points("bullet", np.arange(len(bullet_x)), bullet_x, bullet_y)
+    return len(world.pairs("bullet", "obstacle")), len(world.pairs("player", "obstacle"))
+
+def measure(function, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatial hash scaling benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 500, 1000, 2500, 5000, 10000])
+    parser.add_argument("--cell-size", type=int, default=64)
+    parser.add_argument("--naive-limit", type=int, default=2500, help="skip the naive loop above this count")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    world = SpatialHash(args.cell_size)
+    print(f"{'entities':>9} {'naive ms':>10} {'collidelist ms':>15} {'hash ms':>9} {'hash us/entity':>15}")
+    for count in args.counts:
+        scene = build_scene(count, rng)
+        hash_ms, hash_hits = measure(spatial_hash, *scene, world)
+        list_ms, list_hits = measure(collidelist, *scene)
+        assert hash_hits == list_hits, (hash_hits, list_hits)
+        if count <= args.naive_limit:
+            naive_ms, naive_hits = measure(naive, *scene, repeat=1)
+            assert naive_hits == hash_hits, (naive_hits, hash_hits)
+            naive_text = f"{naive_ms:10.2f}"
+        else:
+            naive_text = f"{'-':>10}"
+        per_entity = hash_ms * 1000 / (count * 2)
+        print(f"{count:>9} {naive_text} {list_ms:15.2f} {hash_ms:9.2f} {per_entity:15.2f}")
+
+if __name__ == "__main__":
+    main()
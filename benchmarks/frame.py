@@ -0,0 +1,201 @@
+# Frame time benchmark suite.
+#
+#     python -m benchmarks.frame
+#     python -m benchmarks.frame --update-baseline
+#
+# Builds a Game in a set of stress scenarios and times Game.update,
+# Game.check_collisions (called from update) and Game.draw separately for
+# every frame. Percentiles are written to --out as JSON and compared with the
+# baseline recorded on this machine; any phase whose p50 or p95 got slower
+# than --tolerance allows is reported and the run exits with status 1.
+# Times only compare on the same machine, so the baseline is not committed.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from airplane_game import SCREEN_HEIGHT, SCREEN_WIDTH, WHITE, Game, IdleController, Obstacle, RandomController
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PHASES = ("update", "check_collisions", "draw")
+PERCENTILES = (50, 90, 95, 99)
+
+# Large enough that nothing in a scenario ends the game
+UNKILLABLE_HEALTH = 10 ** 9
+
+def add_obstacle(game, x, y):
+    obstacle = game.lifecycle.spawn(Obstacle, (game.all_sprites, game.obstacles), game.level, game.rng, game.balance)
+    obstacle.rect.topleft = (x, y)
+
+class Scenario:
+    name = None
+    frames = 1000
+
+    def controller(self, seed):
+        return IdleController()
+
+    def setup(self, game):
+        pass
+
+    def maintain(self, game):
+        # Runs before every frame to hold the scenario at its stress level
+        pass
+
+class Obstacles500(Scenario):
+    name = "obstacles_500"
+
+    def setup(self, game):
+        self.fill(game)
+
+    def maintain(self, game):
+        self.fill(game)
+
+    def fill(self, game):
+        while len(game.obstacles) < 500:
+            add_obstacle(game, game.rng.randrange(SCREEN_WIDTH // 3, SCREEN_WIDTH - 40),
+                         game.rng.randrange(SCREEN_HEIGHT - 40))
+
+class BossLevel20(Scenario):
+    name = "boss_level_20"
+    live_bullets = 2000
+
+    def setup(self, game):
+        game.level = 20
+        game.spawn_boss()
+        game.boss_spawn_score = UNKILLABLE_HEALTH
+
+    def maintain(self, game):
+        boss = game.boss
+        boss.rect.x = SCREEN_WIDTH - 250
+        boss.health = UNKILLABLE_HEALTH
+        ring = 0
+        while len(boss.bullets) < self.live_bullets:
+            boss.bullets.spawn_ring(boss.rect.centerx, boss.rect.centery, 64, 3 + ring % 4, offset=ring * 3)
+            ring += 1
+
+class Particles5000(Scenario):
+    name = "particles_5000"
+
+    def maintain(self, game):
+        particles = game.particles
+        while len(particles) < 5000:
+            particles.emit(game.rng.randrange(SCREEN_WIDTH), game.rng.randrange(SCREEN_HEIGHT), WHITE, 50)
+
+class LongSession(Scenario):
+    name = "long_session"
+    frames = 100000
+
+    def controller(self, seed):
+        return RandomController(seed)
+
+SCENARIOS = [Obstacles500, BossLevel20, Particles5000, LongSession]
+
+def timed(samples, function):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    if len(ms) == 0:
+        return {}
+    result = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}
+    result["mean"] = float(ms.mean())
+    result["max"] = float(ms.max())
+    return result
+
+def run_scenario(scenario, frames, seed):
+    game = Game(controller=scenario.controller(seed), seed=seed)
+    game.airplane.health = UNKILLABLE_HEALTH
+    scenario.setup(game)
+
+    samples = {phase: [] for phase in PHASES}
+    game.check_collisions = timed(samples["check_collisions"], game.check_collisions)
+    update = timed(samples["update"], game.update)
+    draw = timed(samples["draw"], game.draw)
+    for _ in range(frames):
+        scenario.maintain(game)
+        game.airplane.health = UNKILLABLE_HEALTH
+        update()
+        draw()
+    return {phase: summarize(values) for phase, values in samples.items()}
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, phases in results["scenarios"].items():
+        for phase, stats in phases.items():
+            old = baseline.get("scenarios", {}).get(name, {}).get(phase)
+            if not old:
+                continue
+            for key in ("p50", "p95"):
+                if key in old and stats[key] > old[key] * (1 + tolerance):
+                    regressions.append((name, phase, key, old[key], stats[key]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase frame time benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=[s.name for s in SCENARIOS], default=[s.name for s in SCENARIOS])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's frame count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json", help="where to write this run's percentiles")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="stored results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before a phase counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "scenarios": {},
+    }
+    for scenario_class in SCENARIOS:
+        if scenario_class.name not in args.scenarios:
+            continue
+        scenario = scenario_class()
+        frames = max(1, int(scenario.frames * args.scale))
+        start = time.perf_counter()
+        results["scenarios"][scenario.name] = phases = run_scenario(scenario, frames, args.seed)
+        print(f"{scenario.name}: {frames} frames in {time.perf_counter() - start:.1f}s")
+        for phase in PHASES:
+            stats = phases[phase]
+            print(f"  {phase:<17} p50 {stats['p50']:7.3f} ms  p95 {stats['p95']:7.3f} ms  p99 {stats['p99']:7.3f} ms")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"Comparing with {args.baseline}")
+    changed = [key for key in ("python", "pygame", "numpy") if baseline.get(key) != results[key]]
+    if changed:
+        print(f"The baseline was recorded with a different {', '.join(changed)}; times may not be comparable")
+    regressions = compare(results, baseline, args.tolerance)
+    for name, phase, key, old, new in regressions:
+        print(f"REGRESSION {name} {phase} {key}: {old:.3f} ms -> {new:.3f} ms")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
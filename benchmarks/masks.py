@@ -0,0 +1,108 @@
+# Narrow phase benchmark.
+#
+#     python -m benchmarks.masks
+#
+# Scatters airplanes, obstacles, power-ups, bosses and bullets over a field
+# whose area grows with the entity count, then times one frame's collision
+# pass three ways: the spatial hash with rect overlap only (the old rules),
+# the spatial hash followed by the cached mask narrow phase, and the spatial
+# hash followed by pygame.sprite.collide_mask with masks built on every call.
+# Every run checks the cached masks find exactly the hits collide_mask does.
+import argparse
+import math
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from airplane_game import Airplane, Boss, Obstacle, PowerUp
+from collision import SpatialHash, bullet_touches, sprites_touch
+from benchmarks.collisions import measure
+
+POWERUP_TYPES = ("health", "invincible", "speed")
+
+class Unmasked(pygame.sprite.Sprite):
+    # Same image and rect as a game sprite but no cached mask, so
+    # collide_mask has to build one from the image every time
+    def __init__(self, sprite):
+        super().__init__()
+        self.image = sprite.image
+        self.rect = sprite.rect
+
+def build_scene(count, rng):
+    side = int(math.sqrt(count) * 80)
+
+    def place(sprite):
+        sprite.rect.topleft = (rng.randrange(side), rng.randrange(side))
+        return sprite
+
+    airplanes = [place(Airplane(rng.choice(("default", "fast", "tank")))) for _ in range(max(1, count // 10))]
+    obstacles = [place(Obstacle(1, rng)) for _ in range(count)]
+    powerups = [place(PowerUp(rng.choice(POWERUP_TYPES), rng)) for _ in range(max(1, count // 20))]
+    bosses = [place(Boss(1)) for _ in range(max(1, count // 100))]
+    bullet_x = np.array([rng.uniform(0, side) for _ in range(count)], dtype=np.float32)
+    bullet_y = np.array([rng.uniform(0, side) for _ in range(count)], dtype=np.float32)
+    return airplanes, obstacles, powerups, bosses, bullet_x, bullet_y
+
+def broad_phase(world, airplanes, obstacles, powerups, bosses, bullet_x, bullet_y):
+    world.clear()
+    for category, sprites in (("player", airplanes), ("obstacle", obstacles),
+                              ("powerup", powerups), ("boss", bosses)):
+        for sprite in sprites:
+            world.add(category, sprite, sprite.rect)
+    world.add_points("bullet", np.arange(len(bullet_x)), bullet_x, bullet_y)
+    sprite_pairs = (world.pairs("player", "obstacle") + world.pairs("player", "powerup")
+                    + world.pairs("player", "boss"))
+    bullet_pairs = world.pairs("bullet", "obstacle") + world.pairs("bullet", "boss")
+    return sprite_pairs, bullet_pairs
+
+def rects(world, scene):
+    sprite_pairs, bullet_pairs = broad_phase(world, *scene)
+    return len(sprite_pairs), len(bullet_pairs)
+
+def cached_masks(world, scene):
+    sprite_pairs, bullet_pairs = broad_phase(world, *scene)
+    bullet_x, bullet_y = scene[4], scene[5]
+    sprites = [pair for pair in sprite_pairs if sprites_touch(*pair)]
+    bullets = [(slot, sprite) for slot, sprite in bullet_pairs
+               if bullet_touches(sprite, bullet_x[slot], bullet_y[slot])]
+    return len(sprites), len(bullets)
+
+def rebuilt_masks(world, scene):
+    sprite_pairs, bullet_pairs = broad_phase(world, *scene)
+    bullet_x, bullet_y = scene[4], scene[5]
+    sprites = [pair for pair in sprite_pairs
+               if pygame.sprite.collide_mask(Unmasked(pair[0]), Unmasked(pair[1]))]
+    bullets = []
+    for slot, sprite in bullet_pairs:
+        mask = pygame.mask.from_surface(sprite.image)
+        if mask.get_at((math.floor(bullet_x[slot]) - sprite.rect.x, math.floor(bullet_y[slot]) - sprite.rect.y)):
+            bullets.append((slot, sprite))
+    return len(sprites), len(bullets)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mask narrow phase benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 500, 1000, 2500, 5000])
+    parser.add_argument("--cell-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    world = SpatialHash(args.cell_size)
+    print(f"{'entities':>9} {'rect ms':>9} {'mask ms':>9} {'overhead':>9} {'rebuilt ms':>11}"
+          f" {'rect hits':>10} {'mask hits':>10}")
+    for count in args.counts:
+        scene = build_scene(count, rng)
+        rect_ms, rect_hits = measure(rects, world, scene)
+        mask_ms, mask_hits = measure(cached_masks, world, scene)
+        rebuilt_ms, rebuilt_hits = measure(rebuilt_masks, world, scene)
+        assert mask_hits == rebuilt_hits, (mask_hits, rebuilt_hits)
+        print(f"{count:>9} {rect_ms:9.2f} {mask_ms:9.2f} {(mask_ms / rect_ms - 1) * 100:8.0f}%"
+              f" {rebuilt_ms:11.2f} {sum(rect_hits):>10} {sum(mask_hits):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Startup time benchmark.
+#
+#     python -m benchmarks.startup
+#
+# Starts a fresh interpreter for every run (so nothing is already imported or
+# initialised) and measures how long importing airplane_game takes, how long
+# Game() takes to construct, the time from Game() to the first drawn frame,
+# the time from launching the process to that frame (interpreter startup
+# included), and how long the background asset loader needs to finish.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import airplane_game
+imported = time.perf_counter() - start
+game = airplane_game.Game(render_fps=0)
+constructed = time.perf_counter() - game.created
+game.draw()
+game.report_startup()
+shown = time.time()
+game.loader.wait()
+print(json.dumps({"import": imported, "game": constructed, "first_frame": game.first_frame_seconds,
+                  "shown": shown, "assets": game.loader.seconds}))
+"""
+
+def measure(runs):
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    samples = []
+    for _ in range(runs):
+        # Wall clock, the only clock shared with the child process
+        launched = time.time()
+        output = subprocess.run([sys.executable, "-c", PROBE], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample["launch"] = sample.pop("shown") - launched
+        samples.append(sample)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and time-to-first-frame benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = measure(args.runs)
+    print(f"{'phase':<12} {'p50 ms':>8} {'max ms':>8}")
+    for phase in ("import", "game", "first_frame", "launch", "assets"):
+        values = np.array([sample[phase] for sample in samples]) * 1000
+        print(f"{phase:<12} {np.percentile(values, 50):>8.1f} {values.max():>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import math
+
+class SpatialHash:
+    # Uniform grid broad phase. Every entity kind registers under a category,
+    # either as a rect or as a point, and overlap queries between two
+    # categories only compare entries that share a grid cell.
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.entries = {}
+        self.cells = {}
+
+    def clear(self):
+        self.entries.clear()
+        self.cells.clear()
+
+    def cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        x0 = int(left // size)
+        y0 = int(top // size)
+        x1 = int((right - 1) // size) if right > left else x0
+        y1 = int((bottom - 1) // size) if bottom > top else y0
+        return x0, y0, x1, y1
+
+    def add(self, category, item, rect):
+        # pygame rects have integer corners, so cells need no conversion
+        left, top, width, height = rect
+        right = left + width
+        bottom = top + height
+        entries = self.entries.get(category)
+        if entries is None:
+            entries = self.entries[category] = []
+            self.cells[category] = {}
+        cells = self.cells[category]
+        index = len(entries)
+        entries.append((item, left, top, right, bottom))
+        size = self.cell_size
+        x0 = left // size
+        y0 = top // size
+        x1 = (right - 1) // size if width > 0 else x0
+        y1 = (bottom - 1) // size if height > 0 else y0
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = [index]
+                else:
+                    cell.append(index)
+
+    def add_points(self, category, items, xs, ys):
+        # Bulk registration for projectile pools, items are usually pool slots
+        entries = self.entries.setdefault(category, [])
+        cells = self.cells.setdefault(category, {})
+        size = self.cell_size
+        index = len(entries)
+        for item, x, y in zip(items.tolist(), xs.tolist(), ys.tolist()):
+            entries.append((item, x, y, x, y))
+            key = (int(x // size), int(y // size))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [index]
+            else:
+                cell.append(index)
+            index += 1
+
+    def overlap(self, a, b):
+        # Rects overlap like pygame.Rect.colliderect, a point must lie inside
+        # the rect like pygame.Rect.collidepoint
+        _, al, at, ar, ab = a
+        _, bl, bt, br, bb = b
+        if al == ar and at == ab:
+            return bl <= al < br and bt <= at < bb
+        if bl == br and bt == bb:
+            return al <= bl < ar and at <= bt < ab
+        return al < br and bl < ar and at < bb and bt < ab
+
+    def candidates(self, category, left, top, right, bottom):
+        cells = self.cells.get(category)
+        if not cells:
+            return ()
+        x0, y0, x1, y1 = self.cell_range(left, top, right, bottom)
+        if x0 == x1 and y0 == y1:
+            return cells.get((x0, y0), ())
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                found.update(cells.get((cx, cy), ()))
+        return found
+
+    def pairs(self, category_a, category_b):
+        # All overlapping (item_a, item_b) pairs, walking whichever side is smaller
+        entries_a = self.entries.get(category_a, ())
+        entries_b = self.entries.get(category_b, ())
+        if not entries_a or not entries_b:
+            return []
+        swapped = len(entries_b) < len(entries_a)
+        if swapped:
+            entries_a, entries_b = entries_b, entries_a
+            category_b = category_a
+        overlap = self.overlap
+        found = []
+        for a in entries_a:
+            for i in self.candidates(category_b, a[1], a[2], a[3], a[4]):
+                b = entries_b[i]
+                if overlap(a, b):
+                    found.append((b[0], a[0]) if swapped else (a[0], b[0]))
+        return found
+
+# Narrow phase, for pairs the broad phase found overlapping. Sprites carry the
+# shared mask of their image, so nothing is built per test.
+
+def sprites_touch(a, b):
+    # Whether any opaque pixels of the two sprites meet
+    return a.mask.overlap(b.mask, (b.rect.x - a.rect.x, b.rect.y - a.rect.y)) is not None
+
+def bullet_touches(sprite, x, y):
+    # Whether the pixel under a bullet inside the sprite's rect is opaque
+    return sprite.mask.get_at((math.floor(x) - sprite.rect.x, math.floor(y) - sprite.rect.y)) != 0
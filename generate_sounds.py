@@ -1,83 +1,152 @@
-import pygame
-import numpy as np
-import os
-import wave
-import struct
-
-# Initialize Pygame mixer
-pygame.mixer.init(frequency=44100, size=-16, channels=2)
-
-def generate_crash_sound():
-    # Generate a crash sound (noise with decreasing amplitude)
-    duration = 0.5  # seconds
-    sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    noise = np.random.uniform(-1, 1, len(t))
-    envelope = np.exp(-5 * t)  # Exponential decay
-    sound = noise * envelope
-    sound = np.clip(sound, -1, 1)
-    sound = (sound * 32767).astype(np.int16)
-    return sound
-
-def generate_powerup_sound():
-    # Generate a powerup sound (rising tone)
-    duration = 0.3
-    sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    frequency = 440 * np.exp(2 * t)  # Rising frequency
-    sound = 0.5 * np.sin(2 * np.pi * frequency * t)
-    sound = np.clip(sound, -1, 1)
-    sound = (sound * 32767).astype(np.int16)
-    return sound
-
-def generate_background_music():
-    # Generate simple background music (repeating pattern)
-    duration = 2.0
-    sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    
-    # Create a simple melody
-    notes = [440, 523.25, 587.33, 659.25]  # A, C, D, E
-    sound = np.zeros_like(t)
-    for i, note in enumerate(notes):
-        start = i * duration / len(notes)
-        end = (i + 1) * duration / len(notes)
-        mask = (t >= start) & (t < end)
-        sound[mask] = 0.3 * np.sin(2 * np.pi * note * t[mask])
-    
-    sound = np.clip(sound, -1, 1)
-    sound = (sound * 32767).astype(np.int16)
-    return sound
-
-def save_wav(filename, sound_data):
-    with wave.open(filename, 'w') as wav_file:
-        # Set the parameters
-        nchannels = 1
-        sampwidth = 2
-        framerate = 44100
-        nframes = len(sound_data)
-        comptype = 'NONE'
-        compname = 'not compressed'
-        
-        wav_file.setparams((nchannels, sampwidth, framerate, nframes, comptype, compname))
-        
-        # Write the audio data
-        for sample in sound_data:
-            wav_file.writeframes(struct.pack('h', sample))
-
-def main():
-    # Create assets directory if it doesn't exist
-    if not os.path.exists("assets"):
-        os.makedirs("assets")
-    
-    # Generate and save sounds
-    crash_sound = generate_crash_sound()
-    powerup_sound = generate_powerup_sound()
-    background_music = generate_background_music()
-    
-    save_wav(os.path.join("assets", "crash.wav"), crash_sound)
-    save_wav(os.path.join("assets", "powerup.wav"), powerup_sound)
-    save_wav(os.path.join("assets", "background.wav"), background_music)
-
-if __name__ == "__main__":
-    main() 
\ No newline at end of file
+import numpy as np
+import os
+import wave
+import json
+import hashlib
+import inspect
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Output format, matching the game's mixer (44.1 kHz, signed 16 bit, stereo)
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+
+ASSETS_DIR = "assets"
+CACHE_FILE = ".sound_cache.json"
+
+def to_pcm(sound):
+    # Float samples in [-1, 1] to 16 bit PCM
+    sound = np.clip(sound, -1, 1)
+    return (sound * 32767).astype(np.int16)
+
+def generate_crash_sound(duration=0.5, decay=5.0, seed=0):
+    # Generate a crash sound (noise with decreasing amplitude)
+    t = np.linspace(0, duration, int(SAMPLE_RATE * duration), False)
+    noise = np.random.default_rng(seed).uniform(-1, 1, len(t))
+    envelope = np.exp(-decay * t)  # Exponential decay
+    return to_pcm(noise * envelope)
+
+def generate_powerup_sound(duration=0.3, base_frequency=440.0, rise=2.0):
+    # Generate a powerup sound (rising tone)
+    t = np.linspace(0, duration, int(SAMPLE_RATE * duration), False)
+    frequency = base_frequency * np.exp(rise * t)  # Rising frequency
+    return to_pcm(0.5 * np.sin(2 * np.pi * frequency * t))
+
+def generate_background_music(duration=2.0, notes=(440, 523.25, 587.33, 659.25), volume=0.3):
+    # Generate simple background music (repeating pattern)
+    t = np.linspace(0, duration, int(SAMPLE_RATE * duration), False)
+
+    # Create a simple melody, one note per equal slice of the loop
+    note_index = np.minimum((t * len(notes) / duration).astype(int), len(notes) - 1)
+    frequency = np.asarray(notes, dtype=np.float64)[note_index]
+    return to_pcm(volume * np.sin(2 * np.pi * frequency * t))
+
+GENERATORS = {
+    "crash": generate_crash_sound,
+    "powerup": generate_powerup_sound,
+    "background": generate_background_music,
+}
+
+# The game's sound effects: file name, generator, parameters
+ASSETS = [
+    ("crash.wav", "crash", {}),
+    ("powerup.wav", "powerup", {}),
+    ("background.wav", "background", {}),
+]
+
+def variant_assets(levels):
+    # Per-level music, a semitone higher each level, and per-airplane power-up tones
+    variants = []
+    base = (440, 523.25, 587.33, 659.25)
+    for level in range(1, levels + 1):
+        ratio = 2 ** ((level - 1) / 12)
+        notes = [round(note * ratio, 2) for note in base]
+        variants.append((os.path.join("variants", f"background_level_{level}.wav"), "background", {"notes": notes}))
+    for airplane, frequency in (("default", 440.0), ("fast", 660.0), ("tank", 330.0)):
+        variants.append((os.path.join("variants", f"powerup_{airplane}.wav"), "powerup", {"base_frequency": frequency}))
+    return variants
+
+def save_wav(filename, sound_data, channels=CHANNELS):
+    # Writes the whole buffer at once, duplicating mono data across channels
+    sound_data = np.asarray(sound_data, dtype="<i2")
+    if sound_data.ndim == 1 and channels > 1:
+        sound_data = np.repeat(sound_data[:, None], channels, axis=1)
+    with wave.open(filename, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(sound_data.tobytes())
+
+def asset_hash(generator, params):
+    # Changes whenever the parameters, the output format, the generator's code
+    # or the code turning its samples into a WAV file change
+    key = {
+        "generator": generator,
+        "source": inspect.getsource(GENERATORS[generator]),
+        "helpers": [inspect.getsource(helper) for helper in (to_pcm, save_wav)],
+        "params": params,
+        "format": [SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def build_asset(path, generator, params):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    save_wav(path, GENERATORS[generator](**params))
+    return path
+
+def load_cache(directory):
+    try:
+        with open(os.path.join(directory, CACHE_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_cache(directory, cache):
+    with open(os.path.join(directory, CACHE_FILE), 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+def build(assets, directory=ASSETS_DIR, workers=None, force=False):
+    # Rebuilds only assets whose content hash changed or whose file is missing,
+    # in parallel across processes. Returns the list of rebuilt file names.
+    os.makedirs(directory, exist_ok=True)
+    cache = load_cache(directory)
+    pending = []
+    for name, generator, params in assets:
+        digest = asset_hash(generator, params)
+        path = os.path.join(directory, name)
+        if not force and cache.get(name) == digest and os.path.exists(path):
+            continue
+        pending.append((name, path, generator, params, digest))
+
+    if len(pending) > 1 and workers != 1:
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(build_asset, *zip(*[(path, generator, params) for _, path, generator, params, _ in pending])))
+    else:
+        for _, path, generator, params, _ in pending:
+            build_asset(path, generator, params)
+
+    for name, _, _, _, digest in pending:
+        cache[name] = digest
+    if pending:
+        save_cache(directory, cache)
+    return [name for name, _, _, _, _ in pending]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the game's sound effects")
+    parser.add_argument("--variants", type=int, default=0, metavar="LEVELS",
+                        help="also build per-level music for this many levels and per-airplane effects")
+    parser.add_argument("--force", action="store_true", help="rebuild everything, ignoring the cache")
+    parser.add_argument("--workers", type=int, help="worker processes for parallel builds")
+    args = parser.parse_args()
+
+    assets = list(ASSETS)
+    if args.variants:
+        assets += variant_assets(args.variants)
+    built = build(assets, workers=args.workers, force=args.force)
+    print(f"Built {len(built)} of {len(assets)} sounds, {len(assets) - len(built)} up to date")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+
+import pygame
+
+from quality import QUALITY_TIERS
+
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+ORANGE = (255, 165, 0)
+GREY = (160, 160, 160)
+CYAN = (0, 200, 255)
+
+class TextCache:
+    # Rendered text surfaces keyed by (text, color), least recently used evicted first
+    def __init__(self, font, max_entries=128):
+        self.font = font
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class Hud:
+    def __init__(self, font, cache_size=128):
+        self.cache = TextCache(font, cache_size)
+        self.fields = {}
+        self.field_renders = 0
+
+        # Static text never changes, render it once
+        self.labels = {
+            "score": self.cache.render("Score: ", WHITE),
+            "health": self.cache.render("Health: ", WHITE),
+            "high_score": self.cache.render("High Score: ", WHITE),
+            "level": self.cache.render("Level: ", WHITE),
+            "airplane": self.cache.render("Airplane: ", WHITE),
+            "boss_health": self.cache.render("Boss Health: ", ORANGE),
+            "quality": self.cache.render("Quality: ", GREY),
+            "partner_score": self.cache.render("P2 Score: ", CYAN),
+            "partner_health": self.cache.render("P2 Health: ", CYAN),
+            "net": self.cache.render("Net: ", GREY),
+        }
+        self.invincible_text = self.cache.render("INVINCIBLE!", YELLOW)
+        self.rewind_text = self.cache.render("<< REWIND", WHITE)
+        self.game_over_text = self.cache.render("GAME OVER - Press R to Restart", WHITE)
+        self.controls_text = self.cache.render("Controls: 1-Default 2-Fast 3-Tank SPACE-Shoot", WHITE)
+
+    def value_surface(self, name, value, color):
+        # Only go back to the cache when the value or its colour changed
+        field = self.fields.get(name)
+        if field is not None and field[0] == (value, color):
+            return field[1]
+        if isinstance(value, int):
+            surface = self.render_number(value, color)
+        else:
+            surface = self.cache.render(str(value), color)
+        self.fields[name] = ((value, color), surface)
+        self.field_renders += 1
+        return surface
+
+    def render_number(self, value, color):
+        # Numbers change every frame, so build them from cached digit glyphs
+        # instead of filling the cache with one entry per value
+        glyphs = [self.cache.render(char, color) for char in str(value)]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        surface = pygame.Surface((width, glyphs[0].get_height()), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+    def draw_field(self, screen, name, value, color, position):
+        label = self.labels[name]
+        x, y = position
+        label_rect = screen.blit(label, (x, y))
+        value_rect = screen.blit(self.value_surface(name, value, color), (x + label.get_width(), y))
+        return label_rect.union(value_rect)
+
+    def draw(self, screen, game):
+        width, height = screen.get_size()
+        drawn = [
+            self.draw_field(screen, "score", game.airplane.score, WHITE, (10, 10)),
+            self.draw_field(screen, "health", game.airplane.health, WHITE, (10, 50)),
+            self.draw_field(screen, "high_score", game.high_score, WHITE, (10, 90)),
+            self.draw_field(screen, "level", game.level, WHITE, (10, 130)),
+            self.draw_field(screen, "airplane", game.airplane.type, WHITE, (10, 170)),
+        ]
+
+        if len(game.players) > 1:
+            partner = game.players[1]
+            drawn.append(self.draw_field(screen, "partner_score", partner.score, CYAN, (10, 210)))
+            drawn.append(self.draw_field(screen, "partner_health", partner.health, CYAN, (10, 250)))
+
+        if game.net is not None:
+            color = ORANGE if game.net.over_budget else GREY
+            drawn.append(self.draw_field(screen, "net", game.net.status, color, (10, height - 60)))
+
+        if game.boss_active:
+            drawn.append(self.draw_field(screen, "boss_health", game.boss.health, ORANGE, (width - 200, 10)))
+
+        if game.airplane.invincible:
+            drawn.append(screen.blit(self.invincible_text, (width - 150, 50)))
+
+        if game.rewinding:
+            drawn.append(screen.blit(self.rewind_text, (width // 2 - 60, 10)))
+
+        if game.game_over:
+            drawn.append(screen.blit(self.game_over_text, (width // 2 - 200, height // 2)))
+
+        if game.quality_tier is not None:
+            # Right aligned, tier names differ in width
+            name = QUALITY_TIERS[game.quality_tier]["name"]
+            text_width = self.labels["quality"].get_width() + self.value_surface("quality", name, GREY).get_width()
+            drawn.append(self.draw_field(screen, "quality", name, GREY, (width - 10 - text_width, height - 60)))
+
+        drawn.append(screen.blit(self.controls_text, (width // 2 - 200, height - 30)))
+        return drawn
+
+    def stats(self):
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "cached": len(self.cache.surfaces),
+            "field_renders": self.field_renders,
+        }
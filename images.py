@@ -0,0 +1,79 @@
+import pygame
+
+class ImageRegistry:
+    # Renders each distinct sprite image once and hands the same surface to
+    # every sprite that uses it. Images are painted lazily on first use (or
+    # all at once with preload), converted to the display's pixel format once
+    # a display exists, and can be packed into a single atlas surface. Each
+    # image also gets one collision mask of its opaque pixels.
+    def __init__(self):
+        self.painters = {}
+        self.images = {}
+        self.masks = {}
+        self.converted = False
+        self.atlas = None
+
+    def register(self, name, size, paint):
+        self.painters[name] = (size, paint)
+        self.images.pop(name, None)
+        self.masks.pop(name, None)
+
+    def render(self, name):
+        size, paint = self.painters[name]
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        paint(image)
+        if self.converted:
+            image = image.convert_alpha()
+        self.images[name] = image
+        return image
+
+    def get(self, name):
+        image = self.images.get(name)
+        if image is None:
+            image = self.render(name)
+        return image
+
+    def mask(self, name):
+        # Converting and atlas packing keep the alpha, so the mask outlives them
+        mask = self.masks.get(name)
+        if mask is None:
+            mask = self.masks[name] = pygame.mask.from_surface(self.get(name))
+        return mask
+
+    def preload(self):
+        for name in self.painters:
+            self.mask(name)
+
+    def convert(self):
+        # Call once the display mode is set; later images convert as they render
+        if self.converted or pygame.display.get_surface() is None:
+            return
+        self.converted = True
+        self.atlas = None
+        for name, image in self.images.items():
+            self.images[name] = image.convert_alpha()
+
+    def pack_atlas(self, width=512):
+        # Shelf-pack every image into one surface and swap in subsurfaces of it
+        self.preload()
+        order = sorted(self.images, key=lambda name: self.images[name].get_height(), reverse=True)
+        positions = {}
+        x = y = shelf = 0
+        for name in order:
+            w, h = self.images[name].get_size()
+            if x + w > width:
+                x, y, shelf = 0, y + shelf, 0
+            positions[name] = (x, y)
+            x += w
+            shelf = max(shelf, h)
+        atlas = pygame.Surface((width, y + shelf), pygame.SRCALPHA)
+        if self.converted:
+            atlas = atlas.convert_alpha()
+        for name, position in positions.items():
+            atlas.blit(self.images[name], position)
+            self.images[name] = atlas.subsurface((position, self.images[name].get_size()))
+        self.atlas = atlas
+        return atlas
+
+    def __len__(self):
+        return len(self.images)
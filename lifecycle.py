@@ -0,0 +1,70 @@
+class SpritePool:
+    # Recycles sprites of one class. Pooled classes implement reset(*args),
+    # which their __init__ also calls, so a recycled sprite comes back exactly
+    # as a freshly constructed one would.
+    def __init__(self, kind, max_free=256):
+        self.kind = kind
+        self.max_free = max_free
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.kind(*args)
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        if len(self.free) < self.max_free:
+            self.free.append(sprite)
+
+class Lifecycle:
+    # Owns spawning and reclaiming of pooled entities. Sprites move in their
+    # own update; anything that has left the screen to the left, been
+    # destroyed or been cleared by a reset goes back to its pool.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pools = {}
+        self.reclaimed = 0
+
+    def pool(self, kind):
+        pool = self.pools.get(kind)
+        if pool is None:
+            pool = self.pools[kind] = SpritePool(kind)
+        return pool
+
+    def spawn(self, kind, groups, *args):
+        sprite = self.pool(kind).acquire(*args)
+        for group in groups:
+            group.add(sprite)
+        return sprite
+
+    def release(self, sprite):
+        if not sprite.alive():
+            return
+        sprite.kill()
+        self.pool(type(sprite)).release(sprite)
+
+    def offscreen(self, rect):
+        return rect.right < 0 or rect.bottom < 0 or rect.top > self.height
+
+    def sweep(self, group):
+        gone = [sprite for sprite in group if self.offscreen(sprite.rect)]
+        for sprite in gone:
+            self.release(sprite)
+        self.reclaimed += len(gone)
+        return len(gone)
+
+    def clear(self, group):
+        for sprite in list(group):
+            self.release(sprite)
+
+    def counts(self):
+        # {class name: (created, pooled)} so long sessions can be checked for growth
+        return {kind.__name__: (pool.created, len(pool.free)) for kind, pool in self.pools.items()}
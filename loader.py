@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+import pygame
+
+class AssetLoader:
+    # Runs slow startup work (disk reads, opening the audio device, decoding
+    # sounds) on a background thread so the game can show its first frame
+    # straight away. Jobs run in the order they were added; the main thread
+    # collects finished results with poll(), or blocks on them with wait().
+    def __init__(self):
+        self.jobs = []
+        self.finished = []
+        self.delivered = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.started = None
+        self.seconds = None
+
+    def add(self, name, job):
+        self.jobs.append((name, job))
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.load, name="asset-loader", daemon=True)
+        self.thread.start()
+
+    def load(self):
+        for name, job in self.jobs:
+            try:
+                outcome = (name, job(), None)
+            except Exception as e:
+                outcome = (name, None, e)
+            with self.lock:
+                self.finished.append(outcome)
+                if len(self.finished) == len(self.jobs):
+                    self.seconds = time.perf_counter() - self.started
+
+    @property
+    def pending(self):
+        # True until every job's outcome has been handed to the main thread
+        return self.delivered < len(self.jobs)
+
+    def poll(self):
+        # (name, result, error) for each job finished since the last poll
+        with self.lock:
+            ready = self.finished[self.delivered:]
+            self.delivered = len(self.finished)
+        return ready
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+        return self.poll()
+
+def load_audio(directory, effects, music):
+    # Opens the mixer and decodes the short sound effects. Music is not loaded
+    # into memory, pygame.mixer.music streams it from disk while it plays.
+    if not os.path.exists(directory):
+        raise FileNotFoundError("Please run generate_sounds.py to create sound effects")
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    sounds = {name: pygame.mixer.Sound(os.path.join(directory, f"{name}.wav")) for name in effects}
+    pygame.mixer.music.load(os.path.join(directory, f"{music}.wav"))
+    pygame.mixer.music.play(-1)
+    return sounds
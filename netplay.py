@@ -0,0 +1,437 @@
+import argparse
+import collections
+import math
+import os
+import socket
+import struct
+import time
+import zlib
+
+import numpy as np
+
+import snapshot
+
+DEFAULT_PORT = 47000
+
+# Client to host, every client tick: the client session (random per client,
+# input sequences start over with it), the host session and newest host tick
+# the client has, its measured latency, then its newest inputs (sequence,
+# controls, time sampled). Inputs repeat across packets, so a lost packet
+# loses nothing.
+INPUT_MAGIC = b"APNI"
+INPUT_HEADER = struct.Struct("<4sIIIfB")
+INPUT = struct.Struct("<IBd")
+REDUNDANT_INPUTS = 8
+
+# Host to client, every host tick: the host session (random per host
+# process, ticks start over with it), the tick, the tick whose state the
+# payload is a delta against (0 for a full state), the last client input
+# applied and when it was sampled, the fragment index and count, then that
+# fragment of the zlib compressed payload
+STATE_MAGIC = b"APNS"
+STATE_HEADER = struct.Struct("<4sIIIIdHH")
+FRAGMENT_SIZE = 1200
+# More than a full stress scene needs, anything above is not from a host
+MAX_FRAGMENTS = 256
+
+# States both sides keep to decode deltas against
+BASELINES = 120
+
+# Client inputs the host lets queue up before skipping ahead to cut latency
+MAX_INPUT_BACKLOG = 2
+
+# Movement and shooting bits of the input bitmask, which keep applying while
+# the host waits for the next input. Airplane switches must not repeat.
+HELD_INPUTS = 0x1F
+
+# Budgets the HUD warns about: payload bytes per tick, and the time from the
+# client sampling an input to it seeing the host apply it
+BANDWIDTH_BUDGET = 2048
+LATENCY_BUDGET = 0.050
+
+# Ticks between updates of the on-screen numbers
+STATS_TICKS = 60
+
+# Seconds without a valid packet before the other side counts as gone
+TIMEOUT = 3.0
+
+# Ticks between repeats of an acknowledged state while the game stands still,
+# so the client knows the host is still there
+KEEPALIVE_TICKS = 30
+
+# What a malformed or corrupted datagram raises while being decoded
+DECODE_ERRORS = (struct.error, zlib.error, ValueError, IndexError)
+
+class Endpoint:
+    # Socket handling and traffic statistics shared by both ends
+    waiting = "waiting for the other player"
+
+    def __init__(self, game):
+        self.game = game
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.sent = 0
+        self.received = 0
+        self.ticks = 0
+        self.latency = 0.0
+        self.latencies = collections.deque(maxlen=10000)
+        self.total_sent = 0
+        self.total_received = 0
+        self.total_ticks = 0
+        self.heard = None
+        self.status = self.waiting
+        self.over_budget = False
+        # Rewinding and quick loads would fork the shared world
+        game.net = self
+        game.history = None
+
+    def connected(self):
+        return self.heard is not None and time.perf_counter() - self.heard < TIMEOUT
+
+    def send_to(self, packet, address):
+        try:
+            self.socket.sendto(packet, address)
+        except OSError as e:
+            print(f"Network error: {e}")
+            return
+        self.sent += len(packet)
+
+    def packets(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except BlockingIOError:
+                return
+            except ConnectionResetError:
+                # The other side is not listening (yet), nothing to read
+                continue
+            self.received += len(data)
+            yield data, address
+
+    def count_tick(self):
+        self.ticks += 1
+        if self.ticks < STATS_TICKS:
+            return
+        sent, received = self.sent / self.ticks, self.received / self.ticks
+        if self.connected():
+            self.status = (f"out {sent:.0f} B/tick  in {received:.0f} B/tick  "
+                           f"input latency {self.latency * 1000:.0f} ms")
+            self.over_budget = max(sent, received) > BANDWIDTH_BUDGET or self.latency > LATENCY_BUDGET
+        else:
+            self.status = self.waiting
+            self.over_budget = False
+        self.total_sent += self.sent
+        self.total_received += self.received
+        self.total_ticks += self.ticks
+        self.sent = self.received = self.ticks = 0
+
+    def summary(self):
+        ticks = max(1, self.total_ticks)
+        text = (f"Network: {self.total_sent / ticks:.0f} B/tick out, "
+                f"{self.total_received / ticks:.0f} B/tick in over {self.total_ticks} ticks")
+        if self.latencies:
+            latencies = np.array(self.latencies) * 1000
+            text += (f", input latency p50 {np.percentile(latencies, 50):.0f} ms"
+                     f" p95 {np.percentile(latencies, 95):.0f} ms")
+        return text
+
+    def close(self):
+        self.socket.close()
+
+class NetHost(Endpoint):
+    # Runs the authoritative game. Doubles as the second airplane's
+    # controller, applying the client's inputs in order, one per tick. After
+    # every tick it sends the client the state as a delta against the newest
+    # state the client has acknowledged.
+    authoritative = True
+
+    def __init__(self, game, port=DEFAULT_PORT, bind=""):
+        super().__init__(game)
+        self.socket.bind((bind, port))
+        self.session = int.from_bytes(os.urandom(4), "little")
+        self.client = None
+        self.client_session = None
+        self.forget_client()
+        self.states = collections.OrderedDict()
+        self.outgoing = []
+        self.idle = 0
+        game.partner_controller = self
+
+    def receive(self):
+        for data, address in self.packets():
+            if not data.startswith(INPUT_MAGIC) or len(data) < INPUT_HEADER.size:
+                continue
+            try:
+                _, client_session, session, ack, latency, count = INPUT_HEADER.unpack_from(data)
+                body = data[INPUT_HEADER.size:]
+                if count > REDUNDANT_INPUTS or len(body) != count * INPUT.size or not math.isfinite(latency):
+                    continue
+                inputs = list(INPUT.iter_unpack(body))
+            except struct.error:
+                continue
+            if address != self.client or client_session != self.client_session:
+                print(f"Player 2 joined from {address[0]}:{address[1]}")
+                self.client = address
+                self.client_session = client_session
+                self.forget_client()
+            self.heard = time.perf_counter()
+            # Acknowledgements for an earlier host's states mean nothing here
+            if session == self.session:
+                self.ack = max(self.ack, ack)
+            self.latency = latency
+            for sequence, controls, sampled in inputs:
+                if sequence > self.applied:
+                    self.inputs[sequence] = (controls, sampled)
+
+    def drop_client(self):
+        # Player 2 stops where it is, with nothing pressed
+        print(f"Player 2 at {self.client[0]}:{self.client[1]} timed out")
+        self.client = None
+        self.client_session = None
+        self.forget_client()
+        self.status = self.waiting
+        self.over_budget = False
+
+    def forget_client(self):
+        # A joining client counts its inputs and host ticks from the start
+        self.inputs = {}
+        self.applied = 0
+        self.applied_sampled = 0.0
+        self.controls = 0
+        self.ack = 0
+        self.sent_tick = None
+
+    def poll(self):
+        # The client's next input, or the last one held while none has arrived
+        if self.inputs:
+            newest = max(self.inputs)
+            if newest - self.applied > MAX_INPUT_BACKLOG:
+                # Too many queued up, skip the oldest rather than let latency grow
+                self.applied = newest - MAX_INPUT_BACKLOG
+            sequence = min(sequence for sequence in self.inputs if sequence > self.applied)
+            controls, self.applied_sampled = self.inputs[sequence]
+            self.applied = sequence
+            self.inputs = {later: value for later, value in self.inputs.items() if later > sequence}
+            self.controls = controls
+            return controls
+        return self.controls & HELD_INPUTS
+
+    def step(self):
+        self.receive()
+        if self.client is not None and not self.connected():
+            self.drop_client()
+        self.game.step()
+        self.send()
+        self.count_tick()
+
+    def send(self):
+        game = self.game
+        if self.client is None:
+            return
+        if game.tick != self.sent_tick:
+            self.sent_tick = game.tick
+            self.outgoing = self.encode()
+            self.idle = 0
+        elif self.ack >= game.tick:
+            self.idle += 1
+            if self.idle % KEEPALIVE_TICKS:
+                return
+        # Repeated every tick until acknowledged, so the last state before
+        # the game stops (game over) gets through even if it was lost once
+        for packet in self.outgoing:
+            self.send_to(packet, self.client)
+
+    def encode(self):
+        game = self.game
+        state = game.network_state()
+        self.states[game.tick] = state
+        while len(self.states) > BASELINES:
+            self.states.popitem(last=False)
+        baseline = self.states.get(self.ack)
+        if baseline is not None:
+            payload, base = snapshot.delta(baseline, state), self.ack
+        else:
+            payload, base = state, 0
+        payload = zlib.compress(payload, 1)
+        count = (len(payload) + FRAGMENT_SIZE - 1) // FRAGMENT_SIZE
+        packets = []
+        for index in range(count):
+            header = STATE_HEADER.pack(STATE_MAGIC, self.session, game.tick, base, self.applied,
+                                       self.applied_sampled, index, count)
+            packets.append(header + payload[index * FRAGMENT_SIZE:(index + 1) * FRAGMENT_SIZE])
+        return packets
+
+class NetClient(Endpoint):
+    # Shows the host's game. The local airplane is predicted: every tick it
+    # starts from the host's latest position for it and replays the inputs
+    # the host has not applied yet, so it answers the keys at once and snaps
+    # to the host's version whenever they disagree.
+    authoritative = False
+    waiting = "waiting for the host"
+
+    def __init__(self, game, address, player=1):
+        super().__init__(game)
+        self.host = address
+        self.player = player
+        self.client_session = int.from_bytes(os.urandom(4), "little")
+        self.sequence = 0
+        self.pending = collections.deque()
+        self.session = None
+        self.states = collections.OrderedDict()
+        self.fragments = {}
+        self.tick = 0
+        self.position = None
+
+    def reset(self, session):
+        # A restarted host counts ticks from the start again
+        if self.session is not None:
+            print("The host restarted, syncing again")
+        self.session = session
+        self.states.clear()
+        self.fragments = {}
+        self.tick = 0
+        self.position = None
+
+    def receive(self):
+        newest = None
+        for data, _ in self.packets():
+            if not data.startswith(STATE_MAGIC) or len(data) < STATE_HEADER.size:
+                continue
+            try:
+                _, session, tick, base, applied, sampled, index, count = STATE_HEADER.unpack_from(data)
+            except struct.error:
+                continue
+            if not 0 < count <= MAX_FRAGMENTS or index >= count:
+                continue
+            if session != self.session:
+                # Only a full state can start syncing with a new host
+                if base:
+                    continue
+                self.reset(session)
+                newest = None
+            self.heard = time.perf_counter()
+            if tick <= self.tick:
+                continue
+            fragment = self.fragments.setdefault(tick, (base, applied, sampled, count, {}))
+            if fragment[3] != count:
+                continue
+            parts = fragment[4]
+            parts[index] = data[STATE_HEADER.size:]
+            if len(parts) == count and (newest is None or tick > newest):
+                newest = tick
+        if newest is not None:
+            self.apply(newest, *self.fragments.pop(newest))
+        # Older ticks are of no use now, and only so many newer ones are kept
+        self.fragments = {tick: fragment for tick, fragment in self.fragments.items() if tick > self.tick}
+        while len(self.fragments) > BASELINES:
+            del self.fragments[min(self.fragments)]
+
+    def apply(self, tick, base, applied, sampled, count, parts):
+        try:
+            payload = zlib.decompress(b"".join(parts[index] for index in range(count)))
+            if base:
+                baseline = self.states.get(base)
+                if baseline is None:
+                    return
+                state = snapshot.apply_delta(payload, baseline)
+            else:
+                state = payload
+            self.game.load_network_state(state)
+        except DECODE_ERRORS:
+            # Damaged on the way, the host sends a newer state next tick
+            return
+        self.states[tick] = state
+        while len(self.states) > BASELINES:
+            self.states.popitem(last=False)
+        self.tick = tick
+        self.position = self.game.players[self.player].rect.topleft
+        if self.pending and self.pending[0][0] <= applied:
+            self.latency = time.perf_counter() - sampled
+            self.latencies.append(self.latency)
+        while self.pending and self.pending[0][0] <= applied:
+            self.pending.popleft()
+
+    def step(self):
+        self.receive()
+        game = self.game
+        controls = game.controller.poll() | game.pending_controls
+        game.pending_controls = 0
+        self.sequence += 1
+        self.pending.append((self.sequence, controls, time.perf_counter()))
+        if len(self.pending) > BASELINES:
+            # The host is not answering, stop predicting further and further ahead
+            self.pending.popleft()
+        inputs = list(self.pending)[-REDUNDANT_INPUTS:]
+        packet = INPUT_HEADER.pack(INPUT_MAGIC, self.client_session, self.session or 0, self.tick,
+                                   self.latency, len(inputs))
+        self.send_to(packet + b"".join(INPUT.pack(*entry) for entry in inputs), self.host)
+        self.predict()
+        self.count_tick()
+
+    def predict(self):
+        airplane = self.game.players[self.player]
+        if self.position is None or not airplane.alive() or self.game.game_over:
+            return
+        airplane.rect.topleft = self.position
+        for _, controls, _ in self.pending:
+            airplane.controls = controls
+            airplane.move()
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, DEFAULT_PORT
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"{port!r} is not a port number")
+    return host, int(port)
+
+class Holding:
+    # Presses the same controls every tick
+    def __init__(self, controls=0):
+        self.controls = controls
+
+    def poll(self):
+        return self.controls
+
+def check(ticks):
+    # A host and two clients one after the other over loopback, in one
+    # process. The second client starts its input sequence over, and the
+    # host must still move player 2 with it.
+    from airplane_game import INPUT_UP, Game
+
+    def play(host, client, ticks):
+        for _ in range(ticks):
+            client.step()
+            host.step()
+            # Nobody dies during the check
+            for airplane in host.game.players:
+                airplane.health = 100
+
+    host = NetHost(Game(headless=True, seed=0, controller=Holding(), players=2), 0, "127.0.0.1")
+    address = host.socket.getsockname()
+    first = NetClient(Game(headless=True, seed=0, controller=Holding(), players=2), address)
+    play(host, first, ticks)
+    first.close()
+    applied = host.applied
+
+    second = NetClient(Game(headless=True, seed=0, controller=Holding(INPUT_UP), players=2), address)
+    top = host.game.players[1].rect.top
+    play(host, second, ticks // 2)
+    moved = top - host.game.players[1].rect.top
+    second.close()
+    host.close()
+    print(f"First client: {applied} inputs applied")
+    print(f"Second client: {host.applied} inputs applied, player 2 moved up {moved} px")
+    return host.applied > 0 and moved > 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Two player network checks")
+    parser.add_argument("--check", action="store_true", help="rejoin a local host with a fresh client")
+    parser.add_argument("--ticks", type=int, default=600, help="ticks the first client plays")
+    args = parser.parse_args()
+    if args.check and not check(args.ticks):
+        print("The host ignored the rejoined client")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import struct
+
+import numpy as np
+import pygame
+
+# Steps particles fade through as their life runs out, when drawn with alpha
+FADE_LEVELS = 8
+
+class ParticleSystem:
+    # All live particles are kept packed at the front of preallocated arrays,
+    # so update and expiry are whole-array operations instead of per-object calls.
+    def __init__(self, capacity=4096, seed=None):
+        self.capacity = capacity
+        # Emission stops at limit, which quality settings can lower below capacity
+        self.limit = capacity
+        self.alpha = True
+        self.rng = np.random.default_rng(seed)
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.int16)
+        self.count = 0
+        self.dropped = 0
+        self.palette = []
+        self.color_index = {}
+        self.sprites = {}
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, color, count=10):
+        # Anything beyond the cap is dropped rather than reallocating
+        room = min(count, self.limit - self.count)
+        self.dropped += count - room
+        if room <= 0:
+            return
+        color = tuple(color[:3])
+        if color not in self.color_index:
+            self.color_index[color] = len(self.palette)
+            self.palette.append(color)
+
+        start, end = self.count, self.count + room
+        self.position[start:end] = (x, y)
+        self.velocity[start:end] = self.rng.uniform(-2, 2, (room, 2))
+        self.life[start:end] = 255
+        self.size[start:end] = self.rng.integers(2, 6, room)
+        self.color[start:end] = self.color_index[color]
+        self.count = end
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        self.position[:n] += self.velocity[:n]
+        self.life[:n] -= 5
+        np.maximum(self.size[:n] - 0.1, 0, out=self.size[:n])
+
+        alive = self.life[:n] > 0
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            k = len(keep)
+            for array in (self.position, self.velocity, self.life, self.size, self.color):
+                array[:k] = array[keep]
+            self.count = k
+
+    def pack(self):
+        # Live particles, the palette their colours index and the RNG that moves them
+        n = self.count
+        rng = self.rng.bit_generator.state
+        palette = np.array(self.palette, dtype=np.uint8).reshape(-1, 3)
+        return b"".join((
+            struct.pack("<IIH", n, rng["has_uint32"], len(palette)),
+            rng["state"]["state"].to_bytes(16, "little"),
+            rng["state"]["inc"].to_bytes(16, "little"),
+            struct.pack("<I", rng["uinteger"]),
+            palette.tobytes(),
+            self.position[:n].tobytes(), self.velocity[:n].tobytes(),
+            self.life[:n].tobytes(), self.size[:n].tobytes(), self.color[:n].tobytes(),
+        ))
+
+    def unpack(self, data):
+        n, has_uint32, colors = struct.unpack_from("<IIH", data)
+        offset = 10
+        state = int.from_bytes(data[offset:offset + 16], "little")
+        inc = int.from_bytes(data[offset + 16:offset + 32], "little")
+        (uinteger,) = struct.unpack_from("<I", data, offset + 32)
+        offset += 36
+        self.rng.bit_generator.state = {
+            "bit_generator": self.rng.bit_generator.state["bit_generator"],
+            "state": {"state": state, "inc": inc},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+        palette = [tuple(color) for color in np.frombuffer(data, np.uint8, colors * 3, offset).reshape(-1, 3).tolist()]
+        offset += colors * 3
+        if palette != self.palette:
+            self.palette = palette
+            self.color_index = {color: i for i, color in enumerate(palette)}
+            self.sprites.clear()
+        for array in (self.position, self.velocity, self.life, self.size, self.color):
+            count = n * (array.size // self.capacity)
+            array[:n] = np.frombuffer(data, array.dtype, count, offset).reshape(array[:n].shape)
+            offset += count * array.itemsize
+        self.count = n
+
+    def set_limit(self, limit):
+        self.limit = min(limit, self.capacity)
+
+    def set_alpha(self, alpha):
+        # With alpha, particles fade out as their life runs down. Without it,
+        # sprites are opaque with a colour key, which blits faster.
+        if alpha != self.alpha:
+            self.alpha = alpha
+            self.sprites.clear()
+
+    def sprite(self, color_index, radius, fade=FADE_LEVELS - 1):
+        key = (color_index, radius, fade)
+        image = self.sprites.get(key)
+        if image is None:
+            if self.alpha:
+                image = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+                color = (*self.palette[color_index], (fade + 1) * 256 // FADE_LEVELS - 1)
+            else:
+                image = pygame.Surface((radius * 2, radius * 2))
+                image.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+                color = self.palette[color_index]
+            pygame.draw.circle(image, color, (radius, radius), radius)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha() if self.alpha else image.convert()
+            self.sprites[key] = image
+        return image
+
+    def draw(self, screen, alpha=1.0, scale=1.0):
+        # alpha interpolates between the previous and the current update,
+        # scale maps game coordinates onto a smaller render surface
+        n = self.count
+        if n == 0:
+            return []
+        size = self.size[:n] * scale if scale != 1.0 else self.size[:n]
+        radius = size.astype(np.int32)
+        visible = np.flatnonzero(radius > 0)
+        if len(visible) == 0:
+            return []
+        radius = radius[visible]
+        position = self.position[visible]
+        if alpha < 1.0:
+            position = position - self.velocity[visible] * (1.0 - alpha)
+        if scale != 1.0:
+            position = position * scale
+        corner = position.astype(np.int32) - radius[:, None]
+        colors = self.color[visible]
+        sprite = self.sprite
+        if not self.alpha:
+            return screen.blits([
+                (sprite(c, r), (x, y))
+                for c, r, (x, y) in zip(colors.tolist(), radius.tolist(), corner.tolist())
+            ])
+        # Life starts at 255, so each fade level covers 32 of it
+        fades = np.minimum(self.life[visible].astype(np.int32) // 32, FADE_LEVELS - 1)
+        return screen.blits([
+            (sprite(c, r, f), (x, y))
+            for c, r, f, (x, y) in zip(colors.tolist(), radius.tolist(), fades.tolist(), corner.tolist())
+        ])
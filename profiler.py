@@ -0,0 +1,156 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+# Frame phases in the order they run
+PHASES = (
+    "events", "controls", "sprites", "particles", "spawning", "collisions", "rules",
+    "background", "scene", "profiler", "display",
+)
+COUNTS = ("sprites", "obstacles", "powerups", "player_bullets", "boss_bullets", "particles", "pooled", "quality")
+
+class NullProfiler:
+    # Stands in while profiling is off so the hooks cost one empty call each
+    enabled = False
+    visible = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+class FrameProfiler:
+    # Keeps the last window frames of per-phase timings and entity counts.
+    # Game code calls mark(phase) when a phase finishes; the time since the
+    # previous mark is charged to it, summed over every tick in the frame.
+    enabled = True
+
+    def __init__(self, window=600, csv_path=None):
+        self.window = window
+        self.index = {phase: i for i, phase in enumerate(PHASES)}
+        self.samples = np.zeros((window, len(PHASES)), dtype=np.float64)
+        self.totals = np.zeros(window, dtype=np.float64)
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self.current = np.zeros(len(PHASES), dtype=np.float64)
+        self.frames = 0
+        self.last = time.perf_counter()
+        self.visible = False
+        self.font = None
+        self.stats = None
+        self.table = None
+        self.graph = None
+        self.graph_frames = 0
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame", "total_ms"] + [f"{p}_ms" for p in PHASES] + list(COUNTS))
+
+    def begin_frame(self):
+        self.current[:] = 0
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self, counts):
+        slot = self.frames % self.window
+        ms = self.current * 1000
+        self.samples[slot] = ms
+        self.totals[slot] = ms.sum()
+        self.counts = counts
+        self.frames += 1
+        if self.frames % 30 == 0:
+            self.stats = None
+        if self.csv_writer:
+            self.csv_writer.writerow(
+                [self.frames, round(self.totals[slot], 4)]
+                + [round(value, 4) for value in ms]
+                + [counts[name] for name in COUNTS]
+            )
+            if self.frames % 600 == 0:
+                self.csv_file.flush()
+
+    def percentiles(self):
+        # (p50, p95, p99) in ms per phase over the rolling window, refreshed twice a second
+        if self.stats is None:
+            n = min(self.frames, self.window)
+            if n == 0:
+                return {}
+            values = np.percentile(self.samples[:n], (50, 95, 99), axis=0)
+            totals = np.percentile(self.totals[:n], (50, 95, 99))
+            self.stats = {phase: tuple(values[:, i]) for i, phase in enumerate(PHASES)}
+            self.stats["frame"] = tuple(totals)
+        return self.stats
+
+    def render_table(self, width, line):
+        # Text only changes when the percentiles refresh, so it is rendered then.
+        # Columns are right-aligned at fixed positions since the font is proportional.
+        rows = ["frame"] + list(PHASES)
+        table = pygame.Surface((width, line * (len(rows) + 4)), pygame.SRCALPHA)
+        columns = (170, 225, 280)
+
+        def cells(y, name, values, color):
+            table.blit(self.font.render(name, True, color), (5, y))
+            for x, value in zip(columns, values):
+                text = self.font.render(value, True, color)
+                table.blit(text, (x - text.get_width(), y))
+
+        cells(0, "phase (ms)", ("p50", "p95", "p99"), (255, 255, 255))
+        stats = self.percentiles()
+        y = 0
+        for row in rows:
+            y += line
+            cells(y, row, [f"{value:.2f}" for value in stats.get(row, (0.0, 0.0, 0.0))], (200, 200, 200))
+        items = [f"{name}: {value}" for name, value in self.counts.items()]
+        for start in range(0, len(items), 3):
+            y += line
+            table.blit(self.font.render("  ".join(items[start:start + 3]), True, (200, 200, 200)), (5, y))
+        return table
+
+    def draw(self, screen):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        width, line, graph_height = 300, 14, 60
+        if self.stats is None or self.table is None:
+            self.table = self.render_table(width, line)
+        panel = pygame.Surface((width, graph_height + self.table.get_height() + 12), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+
+        # Frame time graph, one column per frame, with the 60 FPS budget line.
+        # It scrolls, so only columns for frames since the last draw are added.
+        if self.graph is None:
+            self.graph = pygame.Surface((width - 10, graph_height), pygame.SRCALPHA)
+            self.graph_frames = max(0, self.frames - self.window)
+        new = self.frames - self.graph_frames
+        if new > 0:
+            new = min(new, self.window, self.graph.get_width())
+            self.graph.scroll(-new, 0)
+            self.graph.fill((0, 0, 0, 0), (self.graph.get_width() - new, 0, new, graph_height))
+            scale = graph_height / 33.4
+            for i in range(new):
+                total = self.totals[(self.frames - new + i) % self.window]
+                height = min(graph_height, int(total * scale))
+                color = (0, 200, 0) if total <= 16.7 else (220, 60, 60)
+                x = self.graph.get_width() - new + i
+                pygame.draw.line(self.graph, color, (x, graph_height - 1), (x, graph_height - 1 - height))
+            self.graph_frames = self.frames
+        panel.blit(self.graph, (5, 0))
+        budget = graph_height - int(16.7 * graph_height / 33.4)
+        pygame.draw.line(panel, (255, 255, 0), (5, budget), (width - 5, budget))
+
+        panel.blit(self.table, (0, graph_height + 6))
+        return screen.blit(panel, (screen.get_width() - width - 10, screen.get_height() - panel.get_height() - 40))
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
@@ -0,0 +1,185 @@
+import math
+import struct
+
+import numpy as np
+import pygame
+
+class ProjectilePool:
+    # Every projectile lives in preallocated arrays; free slots are kept on a
+    # stack so spawning and expiry never allocate. Updates run on the whole
+    # batch, and projectiles that left the screen are culled right away.
+    def __init__(self, capacity, radius, color, width, height, lifetime=100):
+        self.capacity = capacity
+        self.radius = radius
+        self.color = color
+        self.width = width
+        self.height = height
+        self.lifetime = lifetime
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+        # The bottom of the free stack that no spawn has reached yet still
+        # holds its initial slots, so snapshots can leave it out
+        self.untouched = capacity
+        self.live = np.empty(0, dtype=np.int32)
+        self.directions = {}
+        self.patterns = {}
+        self.dropped = 0
+        self.images = {}
+
+    def __len__(self):
+        return self.capacity - self.free_count
+
+    def direction(self, angle):
+        # Unit vector for an angle in degrees, computed once per angle
+        vector = self.directions.get(angle)
+        if vector is None:
+            radians = math.radians(angle)
+            vector = (math.cos(radians), math.sin(radians))
+            self.directions[angle] = vector
+        return vector
+
+    def pattern(self, count, offset=0):
+        # Unit vectors for a ring of count evenly spaced angles, starting at offset
+        key = (count, offset)
+        vectors = self.patterns.get(key)
+        if vectors is None:
+            vectors = np.array(
+                [self.direction(offset + i * 360 / count) for i in range(count)],
+                dtype=np.float32,
+            )
+            self.patterns[key] = vectors
+        return vectors
+
+    def spawn(self, x, y, vx, vy):
+        vx = np.atleast_1d(np.asarray(vx, dtype=np.float32))
+        vy = np.atleast_1d(np.asarray(vy, dtype=np.float32))
+        count = min(len(vx), self.free_count)
+        self.dropped += len(vx) - count
+        if count <= 0:
+            return
+        slots = self.free[self.free_count - count:self.free_count].copy()
+        self.free_count -= count
+        self.untouched = min(self.untouched, self.free_count)
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = vx[:count]
+        self.vy[slots] = vy[:count]
+        self.life[slots] = self.lifetime
+        self.active[slots] = True
+        self.live = np.flatnonzero(self.active)
+
+    def spawn_one(self, x, y, vx, vy):
+        self.spawn(x, y, (vx,), (vy,))
+
+    def spawn_ring(self, x, y, count, speed, offset=0):
+        vectors = self.pattern(count, offset) * speed
+        self.spawn(x, y, vectors[:, 0], vectors[:, 1])
+
+    def spawn_spread(self, x, y, angle, arc, count, speed):
+        # Fan of count projectiles centred on angle, covering arc degrees
+        if count == 1:
+            angles = [angle]
+        else:
+            angles = [angle - arc / 2 + i * arc / (count - 1) for i in range(count)]
+        vectors = np.array([self.direction(a) for a in angles], dtype=np.float32) * speed
+        self.spawn(x, y, vectors[:, 0], vectors[:, 1])
+
+    def release(self, slots):
+        slots = np.asarray(slots, dtype=np.int32)
+        slots = slots[self.active[slots]]
+        if len(slots) == 0:
+            return
+        self.active[slots] = False
+        self.free[self.free_count:self.free_count + len(slots)] = slots
+        self.free_count += len(slots)
+        self.live = np.flatnonzero(self.active)
+
+    def clear(self):
+        self.release(self.live)
+
+    def update(self):
+        live = self.live
+        if len(live) == 0:
+            return
+        x = self.x[live] + self.vx[live]
+        y = self.y[live] + self.vy[live]
+        vx = self.vx[live]
+        vy = self.vy[live]
+        self.x[live] = x
+        self.y[live] = y
+        self.life[live] -= 1
+
+        # A projectile past an edge and still moving away can never come back
+        r = self.radius
+        gone = (
+            (self.life[live] <= 0)
+            | ((x < -r) & (vx <= 0))
+            | ((x > self.width + r) & (vx >= 0))
+            | ((y < -r) & (vy <= 0))
+            | ((y > self.height + r) & (vy >= 0))
+        )
+        if gone.any():
+            self.release(live[gone])
+
+    def pack(self):
+        # The free stack above its untouched bottom, since its order decides
+        # which slots spawns take, then every live projectile
+        live = self.live
+        return b"".join((
+            struct.pack("<III", self.free_count, self.untouched, len(live)),
+            self.free[self.untouched:self.free_count].tobytes(),
+            live.astype(np.int32).tobytes(),
+            self.x[live].tobytes(), self.y[live].tobytes(),
+            self.vx[live].tobytes(), self.vy[live].tobytes(),
+            self.life[live].tobytes(),
+        ))
+
+    def unpack(self, data):
+        self.free_count, self.untouched, count = struct.unpack_from("<III", data)
+        offset = 12
+        self.free[:self.untouched] = np.arange(self.capacity - 1, self.capacity - 1 - self.untouched, -1)
+        used = self.free_count - self.untouched
+        self.free[self.untouched:self.free_count] = np.frombuffer(data, np.int32, used, offset)
+        offset += 4 * used
+        live = np.frombuffer(data, np.int32, count, offset).copy()
+        offset += 4 * count
+        for array in (self.x, self.y, self.vx, self.vy, self.life):
+            array[live] = np.frombuffer(data, array.dtype, count, offset)
+            offset += 4 * count
+        self.active[:] = False
+        self.active[live] = True
+        self.live = live
+
+    def image(self, r):
+        image = self.images.get(r)
+        if image is None:
+            image = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+            pygame.draw.circle(image, self.color, (r, r), r)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            self.images[r] = image
+        return image
+
+    def draw(self, screen, alpha=1.0, scale=1.0):
+        # alpha interpolates between the previous and the current update,
+        # scale maps game coordinates onto a smaller render surface
+        live = self.live
+        if len(live) == 0:
+            return []
+        r = max(1, round(self.radius * scale))
+        image = self.image(r)
+        corners = np.empty((len(live), 2), dtype=np.int32)
+        if alpha < 1.0:
+            corners[:, 0] = (self.x[live] - self.vx[live] * (1.0 - alpha)) * scale
+            corners[:, 1] = (self.y[live] - self.vy[live] * (1.0 - alpha)) * scale
+        else:
+            corners[:, 0] = self.x[live] * scale
+            corners[:, 1] = self.y[live] * scale
+        corners -= r
+        return screen.blits([(image, corner) for corner in corners.tolist()])
@@ -0,0 +1,91 @@
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+# Quality tiers, best first. Each sets how much of every star layer is drawn
+# (and how many far layers are dropped), the particle cap, whether particles
+# are alpha blended or drawn with a colour key, and the internal render scale
+# that is upscaled to the window.
+QUALITY_TIERS = (
+    {"name": "high", "star_layers": 3, "star_fraction": 1.0, "particles": 8192, "particle_alpha": True, "render_scale": 1.0},
+    {"name": "medium", "star_layers": 3, "star_fraction": 0.5, "particles": 2048, "particle_alpha": True, "render_scale": 1.0},
+    {"name": "low", "star_layers": 2, "star_fraction": 0.5, "particles": 512, "particle_alpha": False, "render_scale": 0.75},
+    {"name": "minimum", "star_layers": 1, "star_fraction": 0.25, "particles": 128, "particle_alpha": False, "render_scale": 0.5},
+)
+
+def tier_index(name):
+    for index, tier in enumerate(QUALITY_TIERS):
+        if tier["name"] == name:
+            return index
+    raise ValueError(f"Unknown quality tier: {name}")
+
+def star_layers(tier, layers):
+    # The far (slow, dim) layers go first, the near layer always stays
+    kept = layers[len(layers) - tier["star_layers"]:]
+    return tuple((max(1, int(count * tier["star_fraction"])),) + tuple(rest) for count, *rest in kept)
+
+class QualityGovernor:
+    # Watches how long recent frames took to simulate and draw (not counting
+    # the frame cap's sleep) and moves one tier at a time to hold the target
+    # frame rate. It drops a tier as soon as the recent average is over
+    # budget, and climbs back only after a long stretch with clear headroom.
+    # A climb that has to be undone soon after doubles the wait before the
+    # next one, so it settles instead of flapping between two tiers.
+    def __init__(self, target_fps=60, tier=0, window=30, headroom=0.6, upgrade_after=180, max_upgrade_after=3600):
+        self.budget = 1.0 / target_fps
+        self.tier = tier
+        self.window = window
+        self.headroom = headroom
+        self.base_upgrade_after = upgrade_after
+        self.upgrade_after = upgrade_after
+        self.max_upgrade_after = max_upgrade_after
+        # Long enough for the longest wait before a climb
+        self.times = deque(maxlen=max(window, upgrade_after, max_upgrade_after))
+        self.frames_in_tier = 0
+        self.last_upgrade = None
+        self.frames = 0
+        self.changes = []
+
+    @property
+    def name(self):
+        return QUALITY_TIERS[self.tier]["name"]
+
+    def record(self, seconds):
+        # Returns the new tier index when the tier changes, otherwise None
+        self.frames += 1
+        self.frames_in_tier += 1
+        self.times.append(seconds)
+        if self.frames_in_tier < self.window:
+            return None
+
+        average = self.newest(self.window).mean()
+        if average > self.budget and self.tier < len(QUALITY_TIERS) - 1:
+            if self.last_upgrade is not None and self.frames - self.last_upgrade < self.upgrade_after:
+                self.upgrade_after = min(self.upgrade_after * 2, self.max_upgrade_after)
+            # That climb did not hold up, whatever happened after it
+            self.last_upgrade = None
+            return self.change(self.tier + 1, average)
+
+        # The headroom check reads up to max_upgrade_after frames, once per
+        # window is often enough
+        if (self.tier > 0 and self.frames_in_tier >= self.upgrade_after and self.frames_in_tier % self.window == 0
+                and np.percentile(self.newest(self.upgrade_after), 95) < self.budget * self.headroom):
+            self.last_upgrade = self.frames
+            return self.change(self.tier - 1, average)
+
+        if self.last_upgrade is not None and self.frames - self.last_upgrade > self.max_upgrade_after:
+            # The last climb held up, be willing to climb quickly again
+            self.upgrade_after = self.base_upgrade_after
+            self.last_upgrade = None
+        return None
+
+    def newest(self, count):
+        return np.fromiter(islice(reversed(self.times), count), dtype=np.float64)
+
+    def change(self, tier, average):
+        self.tier = tier
+        self.frames_in_tier = 0
+        self.times.clear()
+        self.changes.append((self.frames, tier, float(average)))
+        return tier
@@ -0,0 +1,55 @@
+import pygame
+
+class DirtyRectRenderer:
+    # Repaints only the regions that changed since the last frame and pushes
+    # them with display.update(rects), falling back to a full redraw and flip
+    # when too much of the screen would be touched anyway.
+    def __init__(self, screen, background, max_dirty_fraction=0.5):
+        self.screen = screen
+        self.background = background
+        self.max_dirty_fraction = max_dirty_fraction
+        self.previous = []
+        self.restored = None
+        self.full_redraw = True
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.pixels_updated = 0
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def dirty_area(self, rects):
+        return sum(rect.width * rect.height for rect in rects)
+
+    def begin_frame(self, scroll=1.0):
+        screen_rect = self.screen.get_rect()
+        if screen_rect.size != self.background.size:
+            self.full_redraw = True
+
+        if not self.full_redraw:
+            # Erase what was drawn last frame and move the stars
+            rects = [rect.clip(screen_rect) for rect in self.previous + self.background.scroll(scroll)]
+            rects = [rect for rect in rects if rect.width and rect.height]
+            limit = screen_rect.width * screen_rect.height * self.max_dirty_fraction
+            if self.dirty_area(rects) <= limit:
+                for rect in rects:
+                    self.background.restore(self.screen, rect)
+                self.restored = rects
+                return
+        self.background.draw(self.screen, scroll)
+        self.restored = None
+
+    def end_frame(self, drawn):
+        screen_rect = self.screen.get_rect()
+        drawn = [rect.clip(screen_rect) for rect in drawn]
+        self.previous = [rect for rect in drawn if rect.width and rect.height]
+        if self.restored is None:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.pixels_updated += screen_rect.width * screen_rect.height
+        else:
+            rects = self.restored + self.previous
+            pygame.display.update(rects)
+            self.partial_frames += 1
+            self.pixels_updated += self.dirty_area(rects)
+        self.full_redraw = False
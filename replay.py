@@ -0,0 +1,108 @@
+import struct
+
+# Recording file layout, all little-endian:
+#   header      magic, version, seed, frames, run count, checkpoint count
+#   runs        (length u16, input bitmask u8) run-length encoded inputs
+#   checkpoints (frame u32, score i32, health i16) trajectory samples
+MAGIC = b"APLR"
+# Version 2 recordings are played with pixel mask collisions
+VERSION = 2
+HEADER = struct.Struct("<4sBQIII")
+RUN = struct.Struct("<HB")
+CHECKPOINT = struct.Struct("<Iih")
+MAX_RUN = 0xFFFF
+
+# Record score and health every second of simulation
+CHECKPOINT_INTERVAL = 60
+
+class Recording:
+    def __init__(self, seed, runs=None, checkpoints=None):
+        self.seed = seed
+        self.runs = runs if runs is not None else []
+        self.checkpoints = checkpoints if checkpoints is not None else []
+
+    @property
+    def frames(self):
+        return sum(length for length, _ in self.runs)
+
+    def inputs(self):
+        for length, controls in self.runs:
+            for _ in range(length):
+                yield controls
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.frames, len(self.runs), len(self.checkpoints)))
+            f.write(b"".join(RUN.pack(length, controls) for length, controls in self.runs))
+            f.write(b"".join(CHECKPOINT.pack(frame, score, health) for frame, score, health in self.checkpoints))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, frames, run_count, checkpoint_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recording")
+        offset = HEADER.size
+        end = offset + run_count * RUN.size
+        runs = [list(run) for run in RUN.iter_unpack(data[offset:end])]
+        offset = end
+        end = offset + checkpoint_count * CHECKPOINT.size
+        checkpoints = [tuple(checkpoint) for checkpoint in CHECKPOINT.iter_unpack(data[offset:end])]
+        recording = cls(seed, runs, checkpoints)
+        if recording.frames != frames:
+            raise ValueError(f"{path} is truncated")
+        return recording
+
+class Recorder:
+    # Collects the input bitmask of every simulation tick, run-length encoded as it goes
+    def __init__(self, seed):
+        self.recording = Recording(seed)
+        self.stopped = False
+
+    def record(self, controls):
+        if self.stopped:
+            return
+        runs = self.recording.runs
+        if runs and runs[-1][1] == controls and runs[-1][0] < MAX_RUN:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, controls])
+
+    def checkpoint(self, frame, score, health, force=False):
+        if self.stopped:
+            return
+        if force or frame % CHECKPOINT_INTERVAL == 0:
+            self.recording.checkpoints.append((frame, score, health))
+
+    def rewind(self, frame):
+        # The game went back to frame, forget the inputs recorded after it
+        if self.stopped:
+            return
+        runs = self.recording.runs
+        excess = self.recording.frames - frame
+        while excess > 0 and runs:
+            if runs[-1][0] <= excess:
+                excess -= runs.pop()[0]
+            else:
+                runs[-1][0] -= excess
+                excess = 0
+        checkpoints = self.recording.checkpoints
+        while checkpoints and checkpoints[-1][0] > frame:
+            checkpoints.pop()
+
+    def stop(self, frame, score, health):
+        if self.stopped:
+            return
+        self.checkpoint(frame, score, health, force=True)
+        self.stopped = True
+
+    def save(self, path):
+        self.recording.save(path)
+
+class ReplayController:
+    def __init__(self, recording):
+        self.inputs = recording.inputs()
+
+    def poll(self):
+        return next(self.inputs, 0)
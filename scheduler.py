@@ -0,0 +1,110 @@
+import heapq
+import json
+import struct
+
+EVENT = struct.Struct("<IbIIBH")
+
+class Event:
+    def __init__(self, tick, priority, callback, args, interval):
+        self.tick = tick
+        self.priority = priority
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+class Scheduler:
+    # Timed game events on a heap keyed by simulation tick, never wall time,
+    # so they behave the same at any frame rate and when stepping headless.
+    # Events due on the same tick run by priority (lowest first), then in the
+    # order they were scheduled. Cancelled events are dropped when they reach
+    # the top of the heap.
+    def __init__(self):
+        self.queue = []
+        self.sequence = 0
+        self.now = 0
+
+    def __len__(self):
+        return sum(1 for _, _, _, event in self.queue if not event.cancelled)
+
+    def push(self, event):
+        heapq.heappush(self.queue, (event.tick, event.priority, self.sequence, event))
+        self.sequence += 1
+        return event
+
+    def at(self, tick, callback, *args, priority=0):
+        return self.push(Event(tick, priority, callback, args, None))
+
+    def after(self, delay, callback, *args, priority=0):
+        return self.at(self.now + delay, callback, *args, priority=priority)
+
+    def every(self, interval, callback, *args, priority=0, first=None):
+        # Repeats every interval ticks, starting interval ticks from now unless
+        # first is given, until cancelled
+        tick = self.now + interval if first is None else first
+        return self.push(Event(tick, priority, callback, args, interval))
+
+    def cancel(self, event):
+        if event is not None:
+            event.cancelled = True
+
+    def clear(self):
+        for _, _, _, event in self.queue:
+            event.cancelled = True
+        self.queue.clear()
+
+    def run(self, tick):
+        # Runs everything due up to and including tick, in order, catching up
+        # on any ticks skipped since the last run. While an event runs, now is
+        # the tick it was due, so whatever it schedules keeps its spacing.
+        # Costs one comparison when nothing is due.
+        queue = self.queue
+        while queue and queue[0][0] <= tick:
+            due, _, _, event = heapq.heappop(queue)
+            if event.cancelled:
+                continue
+            self.now = due
+            if event.interval:
+                event.tick += event.interval
+                self.push(event)
+            event.callback(*event.args)
+        self.now = tick
+
+    def pack(self, owner, refs=()):
+        # Callbacks must be methods of owner and are stored by name, arguments
+        # as JSON. refs are events the owner holds on to, stored as positions
+        # in the queue so unpack can hand back their replacements.
+        live = [entry for entry in self.queue if not entry[3].cancelled]
+        positions = {id(entry[3]): i for i, entry in enumerate(live)}
+        parts = [struct.pack("<III", self.now, self.sequence, len(live))]
+        for tick, priority, sequence, event in live:
+            if getattr(event.callback, "__self__", None) is not owner:
+                raise ValueError(f"Cannot save event {event.callback!r}")
+            name = event.callback.__name__.encode()
+            args = json.dumps(event.args).encode() if event.args else b""
+            parts.append(EVENT.pack(tick, priority, sequence, event.interval or 0, len(name), len(args)))
+            parts.append(name)
+            parts.append(args)
+        parts.append(struct.pack(f"<{len(refs)}i", *(positions.get(id(event), -1) for event in refs)))
+        return b"".join(parts)
+
+    def unpack(self, data, owner, refs=0):
+        # Replaces the queue, returning the events refs pointed at (None for
+        # events that were not pending)
+        self.now, self.sequence, count = struct.unpack_from("<III", data)
+        offset = 12
+        self.clear()
+        events = []
+        for _ in range(count):
+            tick, priority, sequence, interval, name_size, args_size = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            callback = getattr(owner, data[offset:offset + name_size].decode())
+            offset += name_size
+            args = tuple(json.loads(data[offset:offset + args_size])) if args_size else ()
+            offset += args_size
+            event = Event(tick, priority, callback, args, interval or None)
+            self.queue.append((tick, priority, sequence, event))
+            events.append(event)
+        heapq.heapify(self.queue)
+        positions = struct.unpack_from(f"<{refs}i", data, offset)
+        return [events[i] if i >= 0 else None for i in positions]
@@ -0,0 +1,195 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+
+RUN_LOG_FILE = "runs.jsonl"
+LEADERBOARD_FILE = "leaderboard.json"
+
+# Written by older versions, read once so the old high score is kept
+LEGACY_HIGH_SCORE_FILE = "high_score.json"
+
+LEADERBOARD_SIZE = 10
+
+def write_atomic(path, text):
+    # Write a temporary file next to the target and rename it over the target,
+    # so a crash leaves either the old file or the new one, never half of one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class Leaderboard:
+    # Best runs overall and indexed by airplane type, level reached and date.
+    # Each index keeps only its top `size` runs, so the leaderboard stays small
+    # however many runs the log holds. log_offset is how much of the run log
+    # it already includes.
+    INDEXES = ("airplane", "level", "date")
+
+    def __init__(self, size=LEADERBOARD_SIZE):
+        self.size = size
+        self.runs = 0
+        self.best = []
+        self.indexes = {key: {} for key in self.INDEXES}
+        self.legacy_high_score = 0
+        self.log_offset = 0
+
+    @property
+    def high_score(self):
+        best = self.best[0]["score"] if self.best else 0
+        return max(best, self.legacy_high_score)
+
+    def insert(self, entries, run):
+        # Stable, so of two equal scores the earlier run ranks first
+        entries.append(run)
+        entries.sort(key=lambda entry: -entry["score"])
+        del entries[self.size:]
+
+    def add(self, run):
+        self.runs += 1
+        self.insert(self.best, run)
+        for key in self.INDEXES:
+            self.insert(self.indexes[key].setdefault(str(run[key]), []), run)
+
+    def top(self, airplane=None, level=None, date=None):
+        for key, value in (("airplane", airplane), ("level", level), ("date", date)):
+            if value is not None:
+                return list(self.indexes[key].get(str(value), []))
+        return list(self.best)
+
+    def to_dict(self):
+        return {
+            "size": self.size,
+            "runs": self.runs,
+            "best": self.best,
+            "indexes": self.indexes,
+            "legacy_high_score": self.legacy_high_score,
+            "log_offset": self.log_offset,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        leaderboard = cls(data["size"])
+        leaderboard.runs = data["runs"]
+        leaderboard.best = data["best"]
+        leaderboard.indexes = {key: data["indexes"][key] for key in cls.INDEXES}
+        leaderboard.legacy_high_score = data["legacy_high_score"]
+        leaderboard.log_offset = data["log_offset"]
+        return leaderboard
+
+class ScoreStore:
+    # Saves finished runs without blocking the game. record() only queues the
+    # run; a writer thread appends it to the run log (the source of truth) and
+    # atomically replaces the leaderboard snapshot. load() reads the snapshot
+    # and then only the part of the log written after it, so startup cost does
+    # not grow with the number of recorded runs.
+    def __init__(self, directory=".", size=LEADERBOARD_SIZE):
+        self.log_path = os.path.join(directory, RUN_LOG_FILE)
+        self.leaderboard_path = os.path.join(directory, LEADERBOARD_FILE)
+        self.legacy_path = os.path.join(directory, LEGACY_HIGH_SCORE_FILE)
+        self.size = size
+        self.leaderboard = None
+        self.torn_log = False
+        self.load_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def load(self):
+        # Safe to call from any thread, the files are only read once
+        with self.load_lock:
+            if self.leaderboard is None:
+                self.leaderboard = self.read()
+            return self.leaderboard
+
+    def read_snapshot(self):
+        try:
+            with open(self.leaderboard_path, 'r') as f:
+                leaderboard = Leaderboard.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+        return leaderboard if leaderboard.size == self.size else None
+
+    def read_legacy_high_score(self):
+        try:
+            with open(self.legacy_path, 'r') as f:
+                return json.load(f).get('high_score', 0)
+        except (FileNotFoundError, ValueError, AttributeError):
+            return 0
+
+    def new_leaderboard(self):
+        leaderboard = Leaderboard(self.size)
+        leaderboard.legacy_high_score = self.read_legacy_high_score()
+        return leaderboard
+
+    def read(self):
+        leaderboard = self.read_snapshot()
+        try:
+            with open(self.log_path, 'rb') as log:
+                end = log.seek(0, os.SEEK_END)
+                if leaderboard is None or leaderboard.log_offset > end:
+                    # No usable snapshot, or the log was replaced: rebuild from the log
+                    leaderboard = self.new_leaderboard()
+                log.seek(leaderboard.log_offset)
+                for line in log:
+                    if not line.endswith(b"\n"):
+                        # A crash cut the last run short, the next one starts on a new line
+                        self.torn_log = True
+                        break
+                    try:
+                        leaderboard.add(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                leaderboard.log_offset = end
+        except FileNotFoundError:
+            if leaderboard is None:
+                leaderboard = self.new_leaderboard()
+        return leaderboard
+
+    def record(self, run):
+        # Returns immediately, the run is written on the writer thread
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, name="score-writer", daemon=True)
+            self.writer.start()
+        self.queue.put(run)
+
+    def write_loop(self):
+        while True:
+            run = self.queue.get()
+            try:
+                if run is None:
+                    return
+                self.write(run)
+            except OSError as e:
+                print(f"Score save error: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, run):
+        leaderboard = self.load()
+        line = json.dumps(run, sort_keys=True) + "\n"
+        if self.torn_log:
+            line = "\n" + line
+        with open(self.log_path, 'ab') as log:
+            log.write(line.encode())
+            log.flush()
+            os.fsync(log.fileno())
+            leaderboard.log_offset = log.tell()
+        self.torn_log = False
+        leaderboard.add(run)
+        write_atomic(self.leaderboard_path, json.dumps(leaderboard.to_dict()))
+
+    def close(self):
+        # The writer finishes every run queued before it stops
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
@@ -0,0 +1,174 @@
+import array
+import collections
+import struct
+import zlib
+
+import numpy as np
+
+# Quick save file layout, all little-endian:
+#   header  magic, version, tick
+#   body    zlib compressed snapshot
+MAGIC = b"APLS"
+VERSION = 3
+HEADER = struct.Struct("<4sBI")
+
+# A snapshot is a list of sections, stored as a table of section lengths
+# followed by the sections themselves
+LENGTH = struct.Struct("<I")
+
+# Delta section encodings, (kind, word count)
+SECTION = struct.Struct("<BI")
+SAME, SPARSE, DENSE = range(3)
+
+# Rewind history memory budget in bytes, snapshots and deltas included
+HISTORY_BUDGET = 8 * 1024 * 1024
+
+def join(sections):
+    table = struct.pack(f"<{len(sections)}I", *map(len, sections))
+    return LENGTH.pack(len(sections)) + table + b"".join(sections)
+
+def split(data):
+    (count,) = LENGTH.unpack_from(data)
+    lengths = struct.unpack_from(f"<{count}I", data, LENGTH.size)
+    sections = []
+    offset = LENGTH.size + 4 * count
+    for length in lengths:
+        sections.append(data[offset:offset + length])
+        offset += length
+    return sections
+
+def diff(a, b):
+    # Indexes of the sections that differ between two snapshots
+    a, b = split(a), split(b)
+    return [i for i in range(max(len(a), len(b))) if i >= len(a) or i >= len(b) or a[i] != b[i]]
+
+def words(data, size):
+    # data zero padded to size bytes, as 32 bit words
+    padded = np.zeros(size // 4, dtype=np.uint32)
+    padded.view(np.uint8)[:len(data)] = np.frombuffer(data, np.uint8)
+    return padded
+
+def padded_size(a, b):
+    return (max(a, b) + 3) // 4 * 4
+
+def delta(a, b):
+    # Section by section XOR of two snapshots as 32 bit words. Sections where
+    # few words changed keep only the changed words and their positions, the
+    # rest keep every word. The delta works both ways: applied to a it gives
+    # b, applied to b it gives a.
+    a, b = split(a), split(b)
+    if len(a) != len(b):
+        raise ValueError("Snapshots have different sections")
+    parts = [LENGTH.pack(len(a)), struct.pack(f"<{2 * len(a)}I", *map(len, a), *map(len, b))]
+    for x, y in zip(a, b):
+        if x == y:
+            parts.append(SECTION.pack(SAME, 0))
+            continue
+        size = padded_size(len(x), len(y))
+        change = words(x, size) ^ words(y, size)
+        changed = np.flatnonzero(change).astype(np.uint32)
+        if 2 * len(changed) < len(change):
+            parts.append(SECTION.pack(SPARSE, len(changed)))
+            parts.append(changed.tobytes())
+            parts.append(change[changed].tobytes())
+        else:
+            parts.append(SECTION.pack(DENSE, len(change)))
+            parts.append(change.tobytes())
+    return b"".join(parts)
+
+def apply_delta(change, known):
+    (count,) = LENGTH.unpack_from(change)
+    lengths = struct.unpack_from(f"<{2 * count}I", change, LENGTH.size)
+    a_lengths, b_lengths = lengths[:count], lengths[count:]
+    known = split(known)
+    # Equal lengths on both sides make either direction the same operation
+    wanted = b_lengths if list(map(len, known)) == list(a_lengths) else a_lengths
+    offset = LENGTH.size + 8 * count
+    sections = []
+    for section, length in zip(known, wanted):
+        kind, n = SECTION.unpack_from(change, offset)
+        offset += SECTION.size
+        if kind == SAME:
+            sections.append(section)
+            continue
+        result = words(section, padded_size(len(section), length))
+        if kind == SPARSE:
+            changed = np.frombuffer(change, np.uint32, n, offset)
+            result[changed] ^= np.frombuffer(change, np.uint32, n, offset + 4 * n)
+            offset += 8 * n
+        else:
+            result ^= np.frombuffer(change, np.uint32, n, offset)
+            offset += 4 * n
+        sections.append(result.tobytes()[:length])
+    return join(sections)
+
+def pack_random(rng):
+    # Mersenne Twister state of a random.Random, 625 words plus the cached gauss value
+    version, state, gauss = rng.getstate()
+    return array.array("I", state).tobytes() + struct.pack("<?d", gauss is not None, gauss or 0.0)
+
+def unpack_random(rng, data):
+    state = tuple(array.array("I", data[:-9]))
+    has_gauss, gauss = struct.unpack("<?d", data[-9:])
+    rng.setstate((3, state, gauss if has_gauss else None))
+
+def save(path, data, tick):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tick))
+        f.write(zlib.compress(data))
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        magic, version, tick = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+        return zlib.decompress(data[HEADER.size:]), tick
+    except (struct.error, zlib.error):
+        raise ValueError(f"{path} is damaged")
+
+class History:
+    # Recent snapshots for rewinding, newest last. Only the newest is kept
+    # whole; every older one is a delta against the one after it, so stepping
+    # back costs one delta. The oldest deltas are dropped to stay within the
+    # memory budget.
+    def __init__(self, budget=HISTORY_BUDGET):
+        self.budget = budget
+        self.current = None
+        self.tick = None
+        self.deltas = collections.deque()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.deltas) + (self.current is not None)
+
+    def clear(self):
+        self.current = None
+        self.tick = None
+        self.deltas.clear()
+        self.size = 0
+
+    def push(self, tick, data):
+        if self.current is not None:
+            change = delta(self.current, data)
+            self.deltas.append((self.tick, change))
+            self.size += len(change) - len(self.current)
+        self.current = data
+        self.tick = tick
+        self.size += len(data)
+        while self.deltas and self.size > self.budget:
+            _, change = self.deltas.popleft()
+            self.size -= len(change)
+
+    def pop(self):
+        # Drops the newest snapshot and returns the one before it, or None
+        # when there is nothing older left
+        if not self.deltas:
+            return None
+        tick, change = self.deltas.pop()
+        self.size -= len(change) + len(self.current)
+        self.current = apply_delta(change, self.current)
+        self.tick = tick
+        self.size += len(self.current)
+        return self.current
@@ -0,0 +1,628 @@
+# Vectorised game environment for bots and automated testing.
+#
+#     python vec_env.py --check --seeds 0 1 2 3 --frames 5000
+#     python vec_env.py --bench --envs 1 256
+#
+# VecEnv runs N independent games in one process. Every game's state lives in
+# batched NumPy arrays (one row per game) and each step applies the rules of
+# Airplane, Obstacle, PowerUp, Boss and Game.check_collisions to all rows at
+# once, so a step costs about the same for 1 game as for 256. Collisions use
+# the sprites' masks through lookup tables: a sprite's opaque pixels, and for
+# each pair of sprite images whether they touch at every offset where their
+# rects overlap. Actions are the same input bitmasks the controllers produce.
+# Spawning draws from one random.Random per game in the same order Game does,
+# so a game seeded like a Game(seed=...) plays out identically; --check
+# verifies that tick by tick.
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from airplane_game import (
+    BOSS_FIRE_INTERVAL, DEFAULT_BALANCE, INPUT_DEFAULT, INPUT_DOWN, INPUT_FAST, INPUT_LEFT,
+    IMAGES, INPUT_RIGHT, INPUT_SHOOT, INPUT_TANK, INPUT_UP, INVINCIBLE_TICKS, POWERUP_INTERVAL,
+    SCREEN_HEIGHT, SCREEN_WIDTH, SPEED_BOOST_TICKS, Game,
+)
+
+AIRPLANE_TYPES = ("default", "fast", "tank")
+POWERUP_TYPES = ("health", "invincible", "speed")
+
+# Sprite sizes, as drawn by register_sprite_images
+AIRPLANE_SIZE = (50, 30)
+OBSTACLE_SIZE = 40
+POWERUP_SIZE = 20
+BOSS_SIZE = 100
+
+# Slots per game. These bound what the rules can have alive at once with room
+# to spare; anything spawned into a full table is dropped and counted.
+OBSTACLE_SLOTS = 16
+POWERUP_SLOTS = 2
+PLAYER_BULLET_SLOTS = 8
+BOSS_BULLET_SLOTS = 32
+
+# Ticks of scheduled events that are not pending
+NEVER = -1
+
+# Nearest entities of each kind included in an observation
+OBSERVED_OBSTACLES = 4
+OBSERVED_BULLETS = 4
+
+def ring(count, speed):
+    # Same float32 velocities as ProjectilePool.spawn_ring
+    vectors = np.array(
+        [(math.cos(math.radians(i * 360 / count)), math.sin(math.radians(i * 360 / count))) for i in range(count)],
+        dtype=np.float32,
+    )
+    return vectors * speed
+
+def mask_array(mask):
+    # A pygame mask as a width x height bool array
+    width, height = mask.get_size()
+    return np.array([[mask.get_at((x, y)) for y in range(height)] for x in range(width)], dtype=bool)
+
+def overlap_table(masks_a, mask_b):
+    # For each of masks_a, whether it touches mask_b placed at offset
+    # (dx, dy), stored at [dx + width_b - 1, dy + height_b - 1]
+    return np.array([mask_array(mask.convolve(mask_b)) for mask in masks_a])
+
+def opaque(candidates, pixels, x, y, kind=0):
+    # Which candidates' integer positions land on a set pixel of a stack of
+    # pixel arrays. Only candidates inside the arrays are looked up.
+    width, height = pixels.shape[1:]
+    inside = candidates & (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    found = np.nonzero(inside)
+    if len(found[0]):
+        inside[found] = pixels[np.broadcast_to(kind, inside.shape)[found], x[found], y[found]]
+    return inside
+
+class BulletBatch:
+    # ProjectilePool with one row of slots per game
+    def __init__(self, envs, slots, radius, lifetime=100):
+        self.radius = radius
+        self.lifetime = lifetime
+        self.x = np.zeros((envs, slots), dtype=np.float32)
+        self.y = np.zeros((envs, slots), dtype=np.float32)
+        self.vx = np.zeros((envs, slots), dtype=np.float32)
+        self.vy = np.zeros((envs, slots), dtype=np.float32)
+        self.life = np.zeros((envs, slots), dtype=np.int32)
+        self.active = np.zeros((envs, slots), dtype=bool)
+        self.dropped = 0
+
+    def spawn(self, rows, x, y, vx, vy):
+        # Spawns len(vx) bullets in each of rows (an index array) at x, y
+        if len(rows) == 0:
+            return
+        vx = np.asarray(vx, dtype=np.float32)
+        vy = np.asarray(vy, dtype=np.float32)
+        free = ~self.active[rows]
+        rank = np.cumsum(free, axis=1) - 1
+        chosen = free & (rank < len(vx))
+        self.dropped += int(len(rows) * len(vx) - chosen.sum())
+        r, slot = np.nonzero(chosen)
+        k = rank[r, slot]
+        row = rows[r]
+        self.x[row, slot] = np.broadcast_to(x, len(rows))[r]
+        self.y[row, slot] = np.broadcast_to(y, len(rows))[r]
+        self.vx[row, slot] = vx[k]
+        self.vy[row, slot] = vy[k]
+        self.life[row, slot] = self.lifetime
+        self.active[row, slot] = True
+
+    def update(self, rows):
+        # rows is a boolean mask of games whose bullets move this tick
+        moving = self.active & rows[:, None]
+        self.x[moving] += self.vx[moving]
+        self.y[moving] += self.vy[moving]
+        self.life[moving] -= 1
+        x, y, vx, vy, r = self.x, self.y, self.vx, self.vy, self.radius
+        gone = moving & (
+            (self.life <= 0)
+            | ((x < -r) & (vx <= 0))
+            | ((x > SCREEN_WIDTH + r) & (vx >= 0))
+            | ((y < -r) & (vy <= 0))
+            | ((y > SCREEN_HEIGHT + r) & (vy >= 0))
+        )
+        self.active[gone] = False
+
+    def inside(self, rows, pixels, left, top, kind=0):
+        # Active bullets in rows whose centre lies on an opaque pixel of each
+        # game's sprite, like Game's bullet_touches
+        x = np.floor(self.x).astype(np.int32) - left[:, None]
+        y = np.floor(self.y).astype(np.int32) - top[:, None]
+        return opaque(self.active & rows[:, None], pixels, x, y, kind)
+
+    def clear(self, rows):
+        self.active[rows] = False
+
+class VecEnv:
+    def __init__(self, num_envs, seed=None, balance=DEFAULT_BALANCE, auto_reset=True):
+        self.num_envs = n = num_envs
+        self.balance = balance
+        self.auto_reset = auto_reset
+        self.seed_rng = random.Random(seed)
+        stats = [balance.airplane_stats[type] for type in AIRPLANE_TYPES]
+        self.type_speed = np.array([speed for speed, _ in stats], dtype=np.int32)
+        self.type_health = np.array([health for _, health in stats], dtype=np.int32)
+        self.boss_ring = ring(8, 5)
+        airplanes = [IMAGES.mask(f"airplane_{type}") for type in AIRPLANE_TYPES]
+        obstacle = IMAGES.mask("obstacle")
+        boss = IMAGES.mask("boss")
+        self.airplane_pixels = np.array([mask_array(mask) for mask in airplanes])
+        self.obstacle_pixels = mask_array(obstacle)[None]
+        self.boss_pixels = mask_array(boss)[None]
+        self.airplane_obstacle = overlap_table(airplanes, obstacle)
+        self.airplane_boss = overlap_table(airplanes, boss)
+        # Indexed by airplane type and power-up type together
+        self.airplane_powerup = np.concatenate(
+            [overlap_table(airplanes, IMAGES.mask(f"powerup_{type}")) for type in POWERUP_TYPES])
+        self.rngs = [None] * n
+        self.seeds = np.zeros(n, dtype=np.int64)
+
+        self.done = np.zeros(n, dtype=bool)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int32)
+        self.level_up_score = np.zeros(n, dtype=np.int64)
+        self.boss_spawn_score = np.zeros(n, dtype=np.int64)
+        # Game keeps these on its Scheduler; here each is the tick an event is due
+        self.obstacle_due = np.zeros(n, dtype=np.int64)
+        self.invincible_until = np.zeros(n, dtype=np.int64)
+        self.speed_until = np.zeros(n, dtype=np.int64)
+        self.boss_fire_due = np.zeros(n, dtype=np.int64)
+
+        self.type = np.zeros(n, dtype=np.int32)
+        self.x = np.zeros(n, dtype=np.int32)
+        self.y = np.zeros(n, dtype=np.int32)
+        self.speed = np.zeros(n, dtype=np.int32)
+        self.health = np.zeros(n, dtype=np.int32)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.shoot_timer = np.zeros(n, dtype=np.int32)
+
+        self.obstacle_x = np.zeros((n, OBSTACLE_SLOTS), dtype=np.int32)
+        self.obstacle_y = np.zeros((n, OBSTACLE_SLOTS), dtype=np.int32)
+        self.obstacle_speed = np.zeros((n, OBSTACLE_SLOTS), dtype=np.int32)
+        self.obstacle_health = np.zeros((n, OBSTACLE_SLOTS), dtype=np.int32)
+        self.obstacle_alive = np.zeros((n, OBSTACLE_SLOTS), dtype=bool)
+
+        self.powerup_x = np.zeros((n, POWERUP_SLOTS), dtype=np.int32)
+        self.powerup_y = np.zeros((n, POWERUP_SLOTS), dtype=np.int32)
+        self.powerup_type = np.zeros((n, POWERUP_SLOTS), dtype=np.int32)
+        self.powerup_alive = np.zeros((n, POWERUP_SLOTS), dtype=bool)
+
+        self.boss_active = np.zeros(n, dtype=bool)
+        self.boss_x = np.zeros(n, dtype=np.int32)
+        self.boss_y = np.zeros(n, dtype=np.int32)
+        self.boss_health = np.zeros(n, dtype=np.int32)
+        self.boss_direction = np.zeros(n, dtype=np.int32)
+
+        self.player_bullets = BulletBatch(n, PLAYER_BULLET_SLOTS, 3)
+        self.boss_bullets = BulletBatch(n, BOSS_BULLET_SLOTS, 5)
+        self.spawns_dropped = 0
+
+    def reset(self, seeds=None, rows=None):
+        # Starts fresh games in rows (all by default), seeded like Game(seed=...)
+        rows = np.arange(self.num_envs) if rows is None else np.asarray(rows)
+        if seeds is None:
+            seeds = [self.seed_rng.randrange(2 ** 32) for _ in rows]
+        for row, seed in zip(rows.tolist(), seeds):
+            self.seeds[row] = seed
+            self.rngs[row] = random.Random(seed)
+            # Game seeds its particle system first, keep the streams in step
+            self.rngs[row].randrange(2 ** 32)
+
+        self.done[rows] = False
+        self.tick[rows] = 0
+        self.score[rows] = 0
+        self.level[rows] = 1
+        self.level_up_score[rows] = 1000
+        self.boss_spawn_score[rows] = 5000
+        self.obstacle_due[rows] = self.obstacle_interval(rows)
+        self.invincible_until[rows] = NEVER
+        self.speed_until[rows] = NEVER
+        self.boss_fire_due[rows] = NEVER
+        self.type[rows] = 0
+        self.health[rows] = self.type_health[0]
+        self.reset_airplane(rows)
+        self.obstacle_alive[rows] = False
+        self.powerup_alive[rows] = False
+        self.boss_active[rows] = False
+        self.player_bullets.clear(rows)
+        self.boss_bullets.clear(rows)
+        return self.observe()
+
+    def reset_airplane(self, rows):
+        # What a freshly constructed Airplane has, apart from health and score
+        self.x[rows] = SCREEN_WIDTH // 4 - AIRPLANE_SIZE[0] // 2
+        self.y[rows] = SCREEN_HEIGHT // 2 - AIRPLANE_SIZE[1] // 2
+        self.speed[rows] = self.type_speed[self.type[rows]]
+        self.invincible[rows] = False
+        self.shoot_timer[rows] = 0
+
+    def obstacle_interval(self, rows):
+        balance = self.balance
+        return np.maximum(balance.obstacle_interval_min,
+                          balance.obstacle_interval - self.level[rows] * balance.obstacle_interval_per_level)
+
+    def step(self, actions):
+        # Advances every running game one tick. Returns observations, rewards
+        # (score gained this tick), done flags and an info dict. With
+        # auto_reset, finished games restart and their final score is in info.
+        actions = np.broadcast_to(np.asarray(actions, dtype=np.int32), (self.num_envs,))
+        running = ~self.done
+        score_before = self.score.copy()
+        self.tick[running] += 1
+
+        self.apply_controls(actions, running)
+        self.update_sprites(actions, running)
+        self.reclaim_offscreen(running)
+        self.spawn(running)
+        self.check_collisions(running)
+
+        level_up = running & (self.score >= self.level_up_score)
+        self.level[level_up] += 1
+        self.level_up_score[level_up] += 1000
+        self.score[running] += 1
+
+        reward = self.score - score_before
+        done = self.done.copy()
+        info = {}
+        finished = np.flatnonzero(done & running)
+        if self.auto_reset and len(finished):
+            info["final_score"] = dict(zip(finished.tolist(), self.score[finished].tolist()))
+            self.reset(rows=finished)
+        return self.observe(), reward, done, info
+
+    def apply_controls(self, actions, running):
+        # Airplane switches rebuild the airplane, keeping score and health
+        switch = np.where(actions & INPUT_DEFAULT, 0,
+                          np.where(actions & INPUT_FAST, 1, np.where(actions & INPUT_TANK, 2, -1)))
+        rows = np.flatnonzero(running & (switch >= 0))
+        if len(rows):
+            self.type[rows] = switch[rows]
+            self.reset_airplane(rows)
+
+    def update_sprites(self, actions, running):
+        # Airplane.update: each move checks the edge after the previous move
+        speed = self.speed
+        move = running & (actions & INPUT_UP > 0) & (self.y > 0)
+        self.y[move] -= speed[move]
+        move = running & (actions & INPUT_DOWN > 0) & (self.y + AIRPLANE_SIZE[1] < SCREEN_HEIGHT)
+        self.y[move] += speed[move]
+        move = running & (actions & INPUT_LEFT > 0) & (self.x > 0)
+        self.x[move] -= speed[move]
+        move = running & (actions & INPUT_RIGHT > 0) & (self.x + AIRPLANE_SIZE[0] < SCREEN_WIDTH)
+        self.x[move] += speed[move]
+
+        self.player_bullets.update(running)
+        self.shoot_timer[running] += 1
+        shoot = np.flatnonzero(running & (actions & INPUT_SHOOT > 0) & (self.shoot_timer >= 15))
+        self.player_bullets.spawn(shoot, self.x[shoot] + AIRPLANE_SIZE[0],
+                                  self.y[shoot] + AIRPLANE_SIZE[1] // 2, (10,), (0,))
+        self.shoot_timer[shoot] = 0
+
+        # Obstacle.update and PowerUp.update
+        moving = self.obstacle_alive & running[:, None]
+        self.obstacle_x[moving] -= self.obstacle_speed[moving]
+        moving = self.powerup_alive & running[:, None]
+        self.powerup_x[moving] -= 4
+
+        # Boss.update: bob up and down, drift left, move its bullets
+        boss = running & self.boss_active
+        self.boss_y[boss] += 2 * self.boss_direction[boss]
+        bounce = boss & ((self.boss_y <= 0) | (self.boss_y + BOSS_SIZE >= SCREEN_HEIGHT))
+        self.boss_direction[bounce] *= -1
+        self.boss_x[boss] -= 1
+        self.boss_bullets.update(boss)
+
+    def reclaim_offscreen(self, running):
+        # Lifecycle.sweep for obstacles and power-ups, then a boss that got past
+        for alive, x, y, size in ((self.obstacle_alive, self.obstacle_x, self.obstacle_y, OBSTACLE_SIZE),
+                                  (self.powerup_alive, self.powerup_x, self.powerup_y, POWERUP_SIZE)):
+            gone = (x + size < 0) | (y + size < 0) | (y > SCREEN_HEIGHT)
+            alive &= ~(gone & running[:, None])
+        escaped = running & self.boss_active & (self.boss_x + BOSS_SIZE < 0)
+        self.remove_boss(escaped)
+
+    def remove_boss(self, rows):
+        # Game.remove_boss: obstacles resume one interval later
+        self.boss_active[rows] = False
+        self.boss_bullets.clear(rows)
+        self.boss_fire_due[rows] = NEVER
+        self.obstacle_due[rows] = self.tick[rows] + self.obstacle_interval(rows)
+
+    def spawn(self, running):
+        # Game.scheduler.run for the events Game schedules by default, in the
+        # same order: effect expiry, obstacles, power-ups, boss fire. The rare
+        # games that spawn this tick draw their random numbers one by one.
+        balance = self.balance
+        tick = self.tick
+        expired = running & (tick == self.invincible_until)
+        self.invincible[expired] = False
+        expired = running & (tick == self.speed_until)
+        self.speed[expired] = self.type_speed[self.type[expired]]
+
+        obstacles = running & (tick == self.obstacle_due)
+        powerups = running & (tick % POWERUP_INTERVAL == 0)
+
+        for row in np.flatnonzero(obstacles | powerups).tolist():
+            rng = self.rngs[row]
+            if obstacles[row]:
+                y = rng.randint(0, SCREEN_HEIGHT - OBSTACLE_SIZE)
+                speed = (rng.randint(balance.obstacle_speed_min, balance.obstacle_speed_max)
+                         + int(self.level[row]) * balance.obstacle_speed_per_level)
+                free = np.flatnonzero(~self.obstacle_alive[row])
+                if len(free):
+                    slot = free[0]
+                    self.obstacle_x[row, slot] = SCREEN_WIDTH
+                    self.obstacle_y[row, slot] = y
+                    self.obstacle_speed[row, slot] = speed
+                    self.obstacle_health[row, slot] = (balance.obstacle_health
+                                                       + int(self.level[row]) * balance.obstacle_health_per_level)
+                    self.obstacle_alive[row, slot] = True
+                else:
+                    self.spawns_dropped += 1
+            if powerups[row]:
+                type = POWERUP_TYPES.index(rng.choice(list(POWERUP_TYPES)))
+                y = rng.randint(0, SCREEN_HEIGHT - POWERUP_SIZE)
+                free = np.flatnonzero(~self.powerup_alive[row])
+                if len(free):
+                    slot = free[0]
+                    self.powerup_x[row, slot] = SCREEN_WIDTH
+                    self.powerup_y[row, slot] = y
+                    self.powerup_type[row, slot] = type
+                    self.powerup_alive[row, slot] = True
+                else:
+                    self.spawns_dropped += 1
+        self.obstacle_due[obstacles] = tick[obstacles] + self.obstacle_interval(obstacles)
+
+        fire = np.flatnonzero(running & self.boss_active & (tick == self.boss_fire_due))
+        self.boss_bullets.spawn(fire, self.boss_x[fire] + BOSS_SIZE // 2, self.boss_y[fire] + BOSS_SIZE // 2,
+                                self.boss_ring[:, 0], self.boss_ring[:, 1])
+        self.boss_fire_due[fire] += BOSS_FIRE_INTERVAL
+
+        # check_boss_spawn
+        boss = running & ~self.boss_active & (self.score >= self.boss_spawn_score)
+        self.boss_active[boss] = True
+        self.boss_x[boss] = SCREEN_WIDTH
+        self.boss_y[boss] = SCREEN_HEIGHT // 2 - BOSS_SIZE // 2
+        self.boss_health[boss] = balance.boss_health + self.level[boss] * balance.boss_health_per_level
+        self.boss_direction[boss] = 1
+        self.boss_spawn_score[boss] += 5000
+        self.boss_fire_due[boss] = tick[boss] + BOSS_FIRE_INTERVAL
+        self.obstacle_due[boss] = NEVER
+
+    def check_collisions(self, running):
+        left = self.x
+        top = self.y
+        airplane = self.type
+        vulnerable = running & ~self.invincible
+
+        # Obstacles the player touched are destroyed and cost 20 health once
+        touched = opaque(self.obstacle_alive & vulnerable[:, None], self.airplane_obstacle,
+                         self.obstacle_x - left[:, None] + OBSTACLE_SIZE - 1,
+                         self.obstacle_y - top[:, None] + OBSTACLE_SIZE - 1, airplane[:, None])
+        self.obstacle_alive &= ~touched
+        self.health[touched.any(axis=1)] -= 20
+
+        boss = running & self.boss_active
+        rammed = opaque(vulnerable & boss, self.airplane_boss, self.boss_x - left + BOSS_SIZE - 1,
+                        self.boss_y - top + BOSS_SIZE - 1, airplane)
+        self.health[rammed] -= 40
+
+        hits = self.boss_bullets.inside(vulnerable & boss, self.airplane_pixels, left, top, airplane[:, None])
+        self.boss_bullets.active &= ~hits
+        self.health -= 10 * hits.sum(axis=1).astype(np.int32)
+
+        # Game.end_run, once per game however many hits landed
+        self.done |= running & (self.health <= 0)
+
+        # Power-ups, slot by slot so two at once apply in order
+        for slot in range(POWERUP_SLOTS):
+            x = self.powerup_x[:, slot]
+            y = self.powerup_y[:, slot]
+            taken = opaque(running & self.powerup_alive[:, slot], self.airplane_powerup,
+                           x - left + POWERUP_SIZE - 1, y - top + POWERUP_SIZE - 1,
+                           self.powerup_type[:, slot] * len(AIRPLANE_TYPES) + airplane)
+            if not taken.any():
+                continue
+            self.powerup_alive[taken, slot] = False
+            type = self.powerup_type[:, slot]
+            heal = taken & (type == 0)
+            self.health[heal] = np.minimum(100, self.health[heal] + 20)
+            shield = taken & (type == 1)
+            self.invincible[shield] = True
+            self.invincible_until[shield] = self.tick[shield] + INVINCIBLE_TICKS
+            boost = taken & (type == 2)
+            self.speed[boost] = 8
+            self.speed_until[boost] = self.tick[boost] + SPEED_BOOST_TICKS
+
+        # Player bullets hitting the boss are all spent, the boss dies when its
+        # health runs out and takes its bullets with it
+        hits = self.player_bullets.inside(boss, self.boss_pixels, self.boss_x, self.boss_y)
+        self.player_bullets.active &= ~hits
+        self.boss_health -= 10 * hits.sum(axis=1).astype(np.int32)
+        killed = boss & hits.any(axis=1) & (self.boss_health <= 0)
+        self.remove_boss(killed)
+        self.score[killed] += 1000
+
+        # Each remaining bullet damages the first live obstacle it is inside
+        bullets = self.player_bullets
+        bullet_x = np.floor(bullets.x).astype(np.int32)
+        bullet_y = np.floor(bullets.y).astype(np.int32)
+        for slot in range(PLAYER_BULLET_SLOTS):
+            inside = opaque(self.obstacle_alive & (running & bullets.active[:, slot])[:, None],
+                            self.obstacle_pixels, bullet_x[:, slot, None] - self.obstacle_x,
+                            bullet_y[:, slot, None] - self.obstacle_y)
+            rows = np.flatnonzero(inside.any(axis=1))
+            if len(rows) == 0:
+                continue
+            target = np.argmax(inside[rows], axis=1)
+            bullets.active[rows, slot] = False
+            self.obstacle_health[rows, target] -= 10
+            destroyed = self.obstacle_health[rows, target] <= 0
+            self.obstacle_alive[rows[destroyed], target[destroyed]] = False
+
+    def observe(self):
+        # One float32 row per game, positions scaled to the screen:
+        #   airplane x, y, health, speed, invincible frames,
+        #   boss active, x, y, health,
+        #   (dx, dy, present) for the nearest obstacles and boss bullets,
+        #   (dx, dy, present, type) for the nearest power-up
+        n = self.num_envs
+        cx = (self.x + AIRPLANE_SIZE[0] // 2).astype(np.float32)
+        cy = (self.y + AIRPLANE_SIZE[1] // 2).astype(np.float32)
+        parts = [
+            np.stack([
+                self.x / SCREEN_WIDTH, self.y / SCREEN_HEIGHT, self.health / 100, self.speed / 10,
+                (self.invincible_until - self.tick) * self.invincible / INVINCIBLE_TICKS,
+                self.boss_active, self.boss_x / SCREEN_WIDTH, self.boss_y / SCREEN_HEIGHT,
+                self.boss_health * self.boss_active / 1000,
+            ], axis=1),
+            self.nearest(self.obstacle_x + OBSTACLE_SIZE / 2, self.obstacle_y + OBSTACLE_SIZE / 2,
+                         self.obstacle_alive, cx, cy, OBSERVED_OBSTACLES),
+            self.nearest(self.boss_bullets.x, self.boss_bullets.y, self.boss_bullets.active,
+                         cx, cy, OBSERVED_BULLETS),
+            self.nearest(self.powerup_x + POWERUP_SIZE / 2, self.powerup_y + POWERUP_SIZE / 2,
+                         self.powerup_alive, cx, cy, 1),
+            (self.powerup_type[np.arange(n), np.argmax(self.powerup_alive, axis=1)]
+             * self.powerup_alive.any(axis=1) / 2)[:, None],
+        ]
+        return np.concatenate(parts, axis=1).astype(np.float32)
+
+    def nearest(self, x, y, present, cx, cy, count):
+        dx = (x - cx[:, None]) / SCREEN_WIDTH
+        dy = (y - cy[:, None]) / SCREEN_HEIGHT
+        distance = np.where(present, dx * dx + dy * dy, np.inf)
+        order = np.argsort(distance, axis=1)[:, :count]
+        rows = np.arange(self.num_envs)[:, None]
+        found = present[rows, order]
+        return np.stack([dx[rows, order] * found, dy[rows, order] * found, found], axis=2).reshape(self.num_envs, -1)
+
+    @property
+    def observation_size(self):
+        return 9 + 3 * OBSERVED_OBSTACLES + 3 * OBSERVED_BULLETS + 4
+
+class ScriptedController:
+    def __init__(self, actions):
+        self.actions = iter(actions)
+
+    def poll(self):
+        return next(self.actions, 0)
+
+def scripted_actions(seed, frames):
+    # Random button mashing with the occasional airplane switch
+    rng = random.Random(seed)
+    actions = []
+    controls = 0
+    while len(actions) < frames:
+        controls = rng.randrange(32)
+        if rng.random() < 0.05:
+            controls |= rng.choice((INPUT_DEFAULT, INPUT_FAST, INPUT_TANK))
+            actions.append(controls)
+            controls &= ~(INPUT_DEFAULT | INPUT_FAST | INPUT_TANK)
+        actions.extend([controls] * rng.randint(5, 30))
+    return actions[:frames]
+
+def game_state(game):
+    airplane = game.airplane
+    return {
+        "score": airplane.score,
+        "health": airplane.health,
+        "level": game.level,
+        "game_over": game.game_over,
+        "airplane": (airplane.type, airplane.rect.x, airplane.rect.y, airplane.speed, airplane.invincible),
+        "obstacles": sorted((o.rect.x, o.rect.y, o.speed, o.health) for o in game.obstacles),
+        "powerups": sorted((p.rect.x, p.rect.y, p.type) for p in game.powerups),
+        "boss": (game.boss.rect.x, game.boss.rect.y, game.boss.health) if game.boss_active else None,
+        "player_bullets": len(game.player_bullets),
+        "boss_bullets": len(game.boss_bullets),
+    }
+
+def env_state(env, row):
+    obstacles = np.flatnonzero(env.obstacle_alive[row])
+    powerups = np.flatnonzero(env.powerup_alive[row])
+    return {
+        "score": int(env.score[row]),
+        "health": int(env.health[row]),
+        "level": int(env.level[row]),
+        "game_over": bool(env.done[row]),
+        "airplane": (AIRPLANE_TYPES[env.type[row]], int(env.x[row]), int(env.y[row]), int(env.speed[row]),
+                     bool(env.invincible[row])),
+        "obstacles": sorted((int(env.obstacle_x[row, i]), int(env.obstacle_y[row, i]),
+                             int(env.obstacle_speed[row, i]), int(env.obstacle_health[row, i])) for i in obstacles),
+        "powerups": sorted((int(env.powerup_x[row, i]), int(env.powerup_y[row, i]),
+                            POWERUP_TYPES[env.powerup_type[row, i]]) for i in powerups),
+        "boss": ((int(env.boss_x[row]), int(env.boss_y[row]), int(env.boss_health[row]))
+                 if env.boss_active[row] else None),
+        "player_bullets": int(env.player_bullets.active[row].sum()),
+        "boss_bullets": int(env.boss_bullets.active[row].sum()),
+    }
+
+def check_agreement(seeds, frames, balance=DEFAULT_BALANCE):
+    # Plays each seed in a headless Game and in one VecEnv side by side with
+    # the same scripted inputs. Returns {seed: None or (tick, field, game, env)}
+    # for the first tick where any compared field differs.
+    actions = np.array([scripted_actions(seed, frames) for seed in seeds], dtype=np.int32)
+    games = [Game(headless=True, controller=ScriptedController(actions[i].tolist()), seed=seed, balance=balance)
+             for i, seed in enumerate(seeds)]
+    env = VecEnv(len(seeds), balance=balance, auto_reset=False)
+    env.reset(seeds)
+    result = {seed: None for seed in seeds}
+    for frame in range(frames):
+        for game in games:
+            game.update()
+        env.step(actions[:, frame])
+        for row, (seed, game) in enumerate(zip(seeds, games)):
+            if result[seed] is not None:
+                continue
+            expected = game_state(game)
+            got = env_state(env, row)
+            for field, value in expected.items():
+                if got[field] != value:
+                    result[seed] = (frame + 1, field, value, got[field])
+                    break
+        if env.done.all():
+            break
+    return result
+
+def bench(envs, steps, seed=0):
+    env = VecEnv(envs, seed=seed)
+    env.reset()
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, 32, size=(steps, envs), dtype=np.int32)
+    start = time.perf_counter()
+    for step in range(steps):
+        env.step(actions[step])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorised game environment")
+    parser.add_argument("--check", action="store_true", help="compare VecEnv with Game on identical seeds")
+    parser.add_argument("--seeds", type=int, nargs="+", default=list(range(8)))
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--bench", action="store_true", help="time steps per second for each --envs count")
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.check:
+        failed = 0
+        for seed, mismatch in check_agreement(args.seeds, args.frames).items():
+            if mismatch is None:
+                print(f"seed {seed}: agrees")
+            else:
+                failed += 1
+                tick, field, expected, got = mismatch
+                print(f"seed {seed}: {field} differs at tick {tick}: Game {expected}, VecEnv {got}")
+        if failed:
+            raise SystemExit(1)
+    if args.bench:
+        for envs in args.envs:
+            seconds = bench(envs, args.steps)
+            print(f"{envs:>5} envs: {seconds / args.steps * 1e6:8.1f} us/step, "
+                  f"{envs * args.steps / seconds:10.0f} env steps/s")
+
+if __name__ == "__main__":
+    main()